@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#
+#   PureResponseClient startup benchmark
+#   Measures the cost of importing pypurepaint and constructing
+#   a client in a fresh interpreter, and optionally of warming
+#   the client up (which fetches the wsdl over the network).
+#
+#   Usage: python benchmarks/bench_startup.py [runs] [--warmup]
+#
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = [
+    ('interpreter', 'pass')
+  , ('import', 'import pypurepaint')
+  , ('import + client', 'import pypurepaint; pypurepaint.PureResponseClient()')
+]
+
+WARMUP_STAGE = (
+    'import + client + warmup'
+  , 'import pypurepaint; pypurepaint.PureResponseClient().warmup()'
+)
+
+TIMER = (
+    'import time; _start = time.time(); %s; '
+    'import sys; sys.stdout.write(repr(time.time() - _start))'
+)
+
+def run_stage(code):
+    output = subprocess.check_output(
+        [sys.executable, '-c', TIMER % code]
+      , cwd = ROOT
+    )
+    return float(output)
+
+def main(argv):
+    runs    = 20
+    stages  = list(STAGES)
+    for arg in argv:
+        if arg == '--warmup':
+            stages.append(WARMUP_STAGE)
+        else:
+            runs = int(arg)
+
+    print '%-28s %10s %10s %10s' % ('stage', 'min ms', 'median ms', 'max ms')
+    for name, code in stages:
+        timings = sorted(run_stage(code) for _ in range(runs))
+        print '%-28s %10.3f %10.3f %10.3f' % (
+            name
+          , timings[0] * 1000
+          , timings[len(timings) // 2] * 1000
+          , timings[-1] * 1000
+        )
+
+    loaded = subprocess.check_output(
+        [
+            sys.executable
+          , '-c'
+          , 'import sys, pypurepaint; '
+            'print " ".join(m for m in ("suds", "csv", "StringIO", "base64", "json") '
+            'if m in sys.modules)'
+        ]
+      , cwd = ROOT
+    ).strip()
+    print 'deferred modules loaded by import: %s' % (loaded or 'none')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -9,13 +9,2328 @@
 #   Authored by Mikael Kohlmyr
 #
 
+#   suds, csv, StringIO, base64 and json are imported on first use 
+#   so that importing this module (e.g. for its constants) stays cheap.
+#   numpy is optional and only used by contact validation, on request.
+#
+
 import datetime
+import sys
 from time import strftime as strftime
-import suds
-from suds.client import Client as SudsPaint
-import StringIO
-import csv
-import base64
+import copy
+import threading
+import time
+import os
+import functools
+import contextlib
+import weakref
+import atexit
+
+_suds_module = None
+
+def _suds():
+    """
+    Internal use.
+    Import suds on first use.
+    """
+    global _suds_module
+    if _suds_module is None:
+        import suds
+        import suds.client
+        import suds.plugin
+        import suds.bindings.multiref
+        _suds_module = suds
+    return _suds_module
+
+_base64_module = None
+
+def _log_exception(message, *args):
+    """
+    Internal use.
+    Log the exception being handled, importing logging on first use.
+    """
+    import logging
+    logging.getLogger(__name__).exception(message, *args)
+
+def _base64():
+    """
+    Internal use.
+    Import base64 on first use.
+    """
+    global _base64_module
+    if _base64_module is None:
+        import base64
+        _base64_module = base64
+    return _base64_module
+
+_numpy_module = None
+
+def _numpy():
+    """
+    Internal use.
+    Import numpy on first use, None if it is not installed.
+    """
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+            _numpy_module = numpy
+        except ImportError:
+            _numpy_module = False
+    return _numpy_module or None
+
+class _KeyPlanCache(object):
+    """
+    Internal use.
+    Bounded cache of _dict_to_ptarr key plans approximating LRU 
+    with two generations of plain dictionaries: lookups hit the 
+    current generation, plans found only in the previous one are 
+    promoted, and once the current generation holds maxsize / 2 
+    plans it replaces the previous one. Keys used since the last 
+    rotation therefore survive it, while a hit costs a single 
+    dictionary lookup.
+    """
+    def __init__(self, maxsize = 1024):
+        self.maxsize    = maxsize
+        self._current   = {}
+        self._previous  = {}
+    
+    def get(self, key):
+        plan = self._current.get(key)
+        if plan is None:
+            plan = self._previous.get(key)
+            if plan is not None:
+                self.put(key, plan)
+        return plan
+    
+    def put(self, key, plan):
+        if len(self._current) >= self.maxsize // 2:
+            self._previous  = self._current
+            self._current   = {}
+        self._current[key] = plan
+        return plan
+    
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+class WireLog(object):
+    """
+    Sampled, size capped log of SOAP envelopes kept in a ring buffer 
+    of the last capacity exchanges. Every failed exchange is kept, 
+    successful ones with probability sample_rate. Envelopes are only 
+    referenced while in flight; sanitising happens only for exchanges 
+    that are kept. It replaces the client's context key and password 
+    wherever they appear, redacts password values, truncates and 
+    hashes large values such as base64 paste files and message bodies, 
+    and redacts authentication exchanges (context bean) entirely, 
+    their reply holding the new context key.
+    """
+    REDACTED    = 'REDACTED'
+    
+    def __init__(self, capacity = 100, sample_rate = 0.01
+        , max_value_size = 256, max_envelope_size = 65536):
+        """
+        ----------------------------------------------
+        @param capacity             - number of exchanges to keep.
+        @param sample_rate          - fraction of successful exchanges 
+                                      to keep.
+        @param max_value_size       - values longer than this are 
+                                      truncated and hashed.
+        @param max_envelope_size    - sanitised envelopes are cut to 
+                                      this length.
+        """
+        import collections
+        import re
+        self.sample_rate        = sample_rate
+        self.max_value_size     = max_value_size
+        self.max_envelope_size  = max_envelope_size
+        self.redacted_fields    = set([PureResponseClient.FIELDS.PASSWORD])
+        self.truncated_fields   = set([
+            PureResponseClient.FIELDS.PASTE_FILE + PureResponseClient.FIELDS.BASE64_PARTIAL
+          , PureResponseClient.FIELDS.BODY_HTML
+          , PureResponseClient.FIELDS.BODY_HTML + PureResponseClient.FIELDS.BASE64_PARTIAL
+        ])
+        self._records           = collections.deque(maxlen = capacity)
+        self._local             = threading.local()
+        self._text_re           = re.compile(r'>([^<]+)<')
+        self._pair_re           = re.compile(
+            r'(<(?:\w+:)?key\b[^>]*>\s*([^<\s]*)\s*</(?:\w+:)?key>\s*'
+            r'<(?:\w+:)?value\b[^>]*>\s*<(?:\w+:)?str\b[^>]*>)(.*?)(</(?:\w+:)?str>)'
+          , re.DOTALL
+        )
+    
+    def sending(self, envelope, secrets = ()):
+        """
+        Reference the envelope being sent by the current thread.
+        ----------------------------------------------
+        @param envelope     - SOAP request.
+        @param secrets      - values to redact wherever they appear, 
+                              e.g. the context key.
+        """
+        self._local.envelope    = envelope
+        self._local.reply       = None
+        self._local.secrets     = secrets
+    
+    def received(self, reply):
+        self._local.reply       = reply
+    
+    def _sanitize_value(self, match):
+        import hashlib
+        head, field, value, tail = match.groups()
+        if field in self.redacted_fields:
+            value = WireLog.REDACTED
+        elif (field in self.truncated_fields) or (len(value) > self.max_value_size):
+            value = '%s...[%d bytes, sha1 %s]' % (
+                value[:self.max_value_size // 4]
+              , len(value)
+              , hashlib.sha1(value).hexdigest()
+            )
+        return head + value + tail
+    
+    def sanitize(self, envelope, secrets = ()):
+        """
+        Redact and truncate the values of an envelope.
+        ----------------------------------------------
+        @param envelope     - SOAP request or reply.
+        @param secrets      - values to redact wherever they appear.
+        """
+        if envelope is None:
+            return None
+        if isinstance(envelope, unicode):
+            envelope = envelope.encode('utf-8')
+        secrets = set(
+            secret.encode('utf-8') if isinstance(secret, unicode) else secret
+            for secret in secrets if secret
+        )
+        if secrets:
+            # only whole element values, a short secret must not 
+            # mangle the rest of the envelope
+            envelope = self._text_re.sub(
+                lambda match: (
+                    '>' + WireLog.REDACTED + '<'
+                    if match.group(1).strip() in secrets else match.group(0)
+                )
+              , envelope
+            )
+        sanitized = self._pair_re.sub(self._sanitize_value, envelope)
+        if len(sanitized) > self.max_envelope_size:
+            sanitized = sanitized[:self.max_envelope_size] + '...[truncated]'
+        return sanitized
+    
+    def finish(self, bean, process, response = None, error = None):
+        """
+        Complete the exchange in flight on the current thread, keeping 
+        it if it failed or is sampled.
+        ----------------------------------------------
+        @param bean         - bean type and class of the request.
+        @param process      - bean process of the request.
+        @param response     - parsed response, if any.
+        @param error        - exception raised by the request, if any.
+        """
+        import random
+        envelope    = getattr(self._local, 'envelope', None)
+        reply       = getattr(self._local, 'reply', None)
+        secrets     = getattr(self._local, 'secrets', ())
+        self._local.envelope = self._local.reply = self._local.secrets = None
+        failed = (error is not None) or (
+            isinstance(response, dict) and (
+                response.get(PureResponseClient.FIELDS.RESULT) != PureResponseClient.VALUES.SUCCESS
+            )
+        )
+        if (not failed) and (random.random() >= self.sample_rate):
+            return
+        if bean.endswith('_' + PureResponseClient.BEAN_CLASSES.CONTEXT):
+            logged_request  = WireLog.REDACTED if envelope is not None else None
+            logged_reply    = WireLog.REDACTED if reply is not None else None
+        else:
+            logged_request  = self.sanitize(envelope, secrets or ())
+            logged_reply    = self.sanitize(reply, secrets or ())
+        self._records.append({
+            'time'          : time.time()
+          , 'bean'          : bean
+          , 'process'       : process
+          , 'failed'        : failed
+          , 'error'         : repr(error) if error is not None else None
+          , 'request_size'  : len(envelope) if envelope is not None else None
+          , 'request'       : logged_request
+          , 'response'      : logged_reply
+        })
+    
+    def records(self, failed_only = False):
+        """
+        Kept exchanges, oldest first.
+        ----------------------------------------------
+        @param failed_only  - only return failed exchanges.
+        """
+        return [
+            record for record in list(self._records)
+            if record['failed'] or not failed_only
+        ]
+    
+    def dump(self, output, failed_only = False):
+        """
+        Write kept exchanges as json lines.
+        ----------------------------------------------
+        @param output       - file object or path to write to.
+        @param failed_only  - only write failed exchanges.
+        """
+        import json
+        if isinstance(output, basestring):
+            with open(output, 'w') as output_file:
+                return self.dump(output_file, failed_only)
+        for record in self.records(failed_only):
+            output.write(json.dumps(record, ensure_ascii = True) + '\n')
+    
+    def clear(self):
+        self._records.clear()
+
+class _InFlightRequest(object):
+    """
+    Internal use.
+    Holds the outcome of a request that is currently being 
+    made on behalf of one or more callers.
+    """
+    def __init__(self):
+        self.done   = threading.Event()
+        self.result = None
+        # sys.exc_info() of the leader's exception, if it raised
+        self.error  = None
+
+class RequestCoalescer(object):
+    """
+    Single-flight layer for identical concurrent requests.
+    The first caller for a given key (the leader) makes the 
+    request, any caller arriving with the same key while it 
+    is in flight waits for and shares the leader's result.
+    Nothing is cached once the request has completed.
+    """
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._in_flight = {}
+    
+    def do(self, key, func, *args):
+        """
+        Run func(*args) unless an identical request is in flight.
+        ----------------------------------------------
+        @param key          - hashable key identifying the request.
+        @param func         - callable making the actual request.
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightRequest()
+                self._in_flight[key] = call
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error[0], call.error[1], call.error[2]
+            # followers get their own copy so that callers mutating 
+            # response dictionaries cannot interfere with each other
+            return copy.deepcopy(call.result)
+        
+        try:
+            call.result = func(*args)
+        except Exception:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker over a rolling window of the last window calls. 
+    The circuit opens when, over at least min_calls calls, the share 
+    of failed calls reaches error_rate or the share of calls slower 
+    than slow_call_duration reaches slow_call_rate. After open_duration 
+    seconds it is half open and lets half_open_calls trial calls 
+    through: it closes if they all succeed and opens again otherwise.
+    """
+    CLOSED      = 'closed'
+    OPEN        = 'open'
+    HALF_OPEN   = 'half_open'
+    
+    def __init__(self, error_rate = 0.5, slow_call_duration = 30.0
+        , slow_call_rate = 0.5, window = 20, min_calls = 10
+        , open_duration = 30.0, half_open_calls = 1):
+        """
+        ----------------------------------------------
+        @param error_rate           - share of failed calls opening 
+                                      the circuit.
+        @param slow_call_duration   - seconds after which a call is slow.
+        @param slow_call_rate       - share of slow calls opening the 
+                                      circuit.
+        @param window               - number of calls in the window.
+        @param min_calls            - calls needed before the circuit 
+                                      can open.
+        @param open_duration        - seconds the circuit stays open.
+        @param half_open_calls      - trial calls when half open.
+        """
+        import collections
+        self.error_rate         = error_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate     = slow_call_rate
+        self.min_calls          = min_calls
+        self.open_duration      = open_duration
+        self.half_open_calls    = half_open_calls
+        self._lock              = threading.Lock()
+        self._calls             = collections.deque(maxlen = window)
+        self._state             = CircuitBreaker.CLOSED
+        self._opened_at         = None
+        self._trials            = 0
+        self._trial_successes   = 0
+    
+    @property
+    def state(self):
+        with self._lock:
+            self._update()
+            return self._state
+    
+    def _update(self):
+        if (self._state is CircuitBreaker.OPEN) and (
+            time.time() - self._opened_at >= self.open_duration):
+            self._state             = CircuitBreaker.HALF_OPEN
+            self._trials            = 0
+            self._trial_successes   = 0
+    
+    def _open(self):
+        self._state     = CircuitBreaker.OPEN
+        self._opened_at = time.time()
+        self._calls.clear()
+    
+    def allow(self):
+        """
+        Whether a call may be made now. Every allowed call must be 
+        followed by record or cancel.
+        """
+        with self._lock:
+            self._update()
+            if self._state is CircuitBreaker.CLOSED:
+                return True
+            if (self._state is CircuitBreaker.HALF_OPEN) and (
+                self._trials < self.half_open_calls):
+                self._trials += 1
+                return True
+            return False
+    
+    def cancel(self):
+        """
+        Give back an allowed call that was not made.
+        """
+        with self._lock:
+            if (self._state is CircuitBreaker.HALF_OPEN) and self._trials:
+                self._trials -= 1
+    
+    def record(self, failed, duration):
+        """
+        Record the outcome of an allowed call.
+        ----------------------------------------------
+        @param failed       - whether the call failed.
+        @param duration     - seconds the call took.
+        """
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self._state is CircuitBreaker.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._state = CircuitBreaker.CLOSED
+                return
+            if self._state is not CircuitBreaker.CLOSED:
+                return
+            self._calls.append((failed, slow))
+            calls = len(self._calls)
+            if calls < self.min_calls:
+                return
+            failures    = sum(1 for call in self._calls if call[0])
+            slow_calls  = sum(1 for call in self._calls if call[1])
+            if (failures >= self.error_rate * calls) or (
+                slow_calls >= self.slow_call_rate * calls):
+                self._open()
+
+class Bulkhead(object):
+    """
+    Limit on the number of concurrent calls. A call waits up to 
+    timeout seconds for a free slot and is rejected otherwise.
+    """
+    def __init__(self, limit, timeout = 0.0):
+        """
+        ----------------------------------------------
+        @param limit        - concurrent calls allowed.
+        @param timeout      - seconds to wait for a free slot.
+        """
+        self.limit      = limit
+        self.timeout    = timeout
+        self.in_use     = 0
+        self._condition = threading.Condition(threading.Lock())
+    
+    def acquire(self):
+        """
+        Take a slot, returning False if none became free in time.
+        """
+        deadline = time.time() + self.timeout
+        with self._condition:
+            while self.in_use >= self.limit:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_use += 1
+            return True
+    
+    def release(self):
+        with self._condition:
+            self.in_use -= 1
+            self._condition.notify()
+
+class Isolation(object):
+    """
+    Circuit breakers and bulkheads per bean class, so that a degraded 
+    or slow bean class (e.g. campaign_list uploads) is failed fast and 
+    cannot take up the capacity of others (e.g. campaign_one2one).
+    Bean classes without a limit get a circuit breaker only.
+    Only requests raising an exception (transport errors, faults, 
+    timeouts) or slower than slow_call_duration count against a 
+    breaker. Error results answered by PAINT, such as validation 
+    exceptions, come from a healthy service and do not, so callers 
+    sending bad data cannot open the circuit for everyone else.
+    Rejected requests return ERROR_CIRCUIT_OPEN or ERROR_BULKHEAD_FULL 
+    from the public methods without being sent.
+    """
+    def __init__(self, limits = None, default_limit = None, timeout = 0.0
+        , **breaker_options):
+        """
+        ----------------------------------------------
+        @param limits           - dictionary of bean class to 
+                                  concurrent calls allowed.
+        @param default_limit    - concurrent calls allowed for other 
+                                  bean classes, None for no limit.
+        @param timeout          - seconds to wait for a bulkhead slot.
+        @param breaker_options  - CircuitBreaker parameters.
+        """
+        self.limits             = dict(limits or {})
+        self.default_limit      = default_limit
+        self.timeout            = timeout
+        self.breaker_options    = breaker_options
+        self.reset()
+    
+    def reset(self):
+        """
+        Drop all breaker and bulkhead state.
+        """
+        self._lock      = threading.Lock()
+        self._breakers  = {}
+        self._bulkheads = {}
+    
+    def breaker(self, bean_class):
+        """
+        Circuit breaker of a bean class.
+        ----------------------------------------------
+        @param bean_class   - bean class, see PureResponseClient.BEAN_CLASSES.
+        """
+        with self._lock:
+            breaker = self._breakers.get(bean_class)
+            if breaker is None:
+                breaker = self._breakers[bean_class] = CircuitBreaker(
+                    **self.breaker_options
+                )
+            return breaker
+    
+    def bulkhead(self, bean_class):
+        """
+        Bulkhead of a bean class, None if it has no limit.
+        ----------------------------------------------
+        @param bean_class   - bean class, see PureResponseClient.BEAN_CLASSES.
+        """
+        limit = self.limits.get(bean_class, self.default_limit)
+        if limit is None:
+            return None
+        with self._lock:
+            bulkhead = self._bulkheads.get(bean_class)
+            if bulkhead is None:
+                bulkhead = self._bulkheads[bean_class] = Bulkhead(
+                    limit
+                  , self.timeout
+                )
+            return bulkhead
+    
+    def states(self):
+        """
+        Dictionary of bean class to circuit state and calls in flight.
+        """
+        with self._lock:
+            breakers    = dict(self._breakers)
+            bulkheads   = dict(self._bulkheads)
+        return dict(
+            (
+                bean_class
+              , {
+                    'state'     : breaker.state
+                  , 'in_use'    : bulkheads[bean_class].in_use if bean_class in bulkheads else None
+                }
+            )
+            for bean_class, breaker in breakers.iteritems()
+        )
+
+class ProfileSpan(object):
+    """
+    A single timed stage of a profiled API call.
+    Times are wall clock seconds as returned by time.time().
+    """
+    def __init__(self, name, args = None):
+        self.name       = name
+        self.args       = args or {}
+        self.start      = time.time()
+        self.end        = None
+        self.children   = []
+        self.marks      = {}
+        self.thread_id  = threading.current_thread().ident
+    
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+    
+    @property
+    def self_duration(self):
+        # children may run concurrently, so subtract the time covered 
+        # by any of them rather than the sum of their durations
+        covered = 0.0
+        cursor  = None
+        for start, end in sorted(
+            (child.start, child.end or time.time()) for child in self.children):
+            if (cursor is not None) and (start < cursor):
+                start = cursor
+            if end > start:
+                covered += end - start
+            cursor = max(cursor, end) if cursor is not None else end
+        return self.duration - covered
+
+class _ProfileSpanContext(object):
+    """
+    Internal use.
+    Context manager opening and closing a span on a Profiler.
+    """
+    def __init__(self, profiler, name, args):
+        self.profiler   = profiler
+        self.name       = name
+        self.args       = args
+    
+    def __enter__(self):
+        return self.profiler._open_span(self.name, self.args)
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler._close_span()
+        return False
+
+class _NullSpanContext(object):
+    """
+    Internal use.
+    Shared no-op stand-in for _ProfileSpanContext used when 
+    profiling is disabled.
+    """
+    def __enter__(self):
+        return None
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpanContext()
+
+class Profiler(object):
+    """
+    Records a tree of spans for every profiled API call.
+    Spans are tracked per thread, so a single profiler may 
+    be shared by a client used from several threads.
+    """
+    def __init__(self):
+        self.roots  = []
+        self._lock  = threading.Lock()
+        self._local = threading.local()
+    
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def _open_span(self, name, args):
+        stack   = self._stack()
+        span    = ProfileSpan(name, args)
+        if stack:
+            stack[-1].children.append(span)
+        else:
+            with self._lock:
+                self.roots.append(span)
+        stack.append(span)
+        return span
+    
+    def _close_span(self):
+        self._stack().pop().end = time.time()
+    
+    def span(self, name, **args):
+        """
+        Context manager timing a stage as a child of the current span.
+        ----------------------------------------------
+        @param name         - name of the stage.
+        @param args         - any extra information to record.
+        """
+        return _ProfileSpanContext(self, name, args)
+    
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+    
+    def mark(self, name):
+        """
+        Record a point in time on the current span.
+        ----------------------------------------------
+        @param name         - name of the mark.
+        """
+        span = self.current()
+        if span is not None:
+            span.marks[name] = time.time()
+    
+    def add_span(self, parent, name, start, end):
+        """
+        Attach an already timed stage to a span.
+        ----------------------------------------------
+        @param parent       - span to attach to.
+        @param name         - name of the stage.
+        @param start        - start time of the stage.
+        @param end          - end time of the stage.
+        """
+        if (start is None) or (end is None):
+            return
+        span        = ProfileSpan(name)
+        span.start  = start
+        span.end    = end
+        parent.children.append(span)
+    
+    @contextlib.contextmanager
+    def attach(self, span):
+        """
+        Continue a span on the current thread, so that work handed 
+        off to another thread is recorded beneath it.
+        ----------------------------------------------
+        @param span         - span opened on another thread.
+        """
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            stack.pop()
+    
+    def reset(self):
+        with self._lock:
+            self.roots = []
+    
+    def _walk(self, span, depth = 0):
+        yield span, depth
+        for child in span.children:
+            for item in self._walk(child, depth + 1):
+                yield item
+    
+    def to_chrome_trace(self):
+        """
+        Export recorded spans as a Chrome trace-event dictionary 
+        (load in chrome://tracing or Perfetto).
+        """
+        pid     = os.getpid()
+        events  = []
+        with self._lock:
+            roots = list(self.roots)
+        for root in roots:
+            for span, depth in self._walk(root):
+                events.append({
+                    'name'  : span.name
+                  , 'cat'   : 'pypurepaint'
+                  , 'ph'    : 'X'
+                  , 'ts'    : int(span.start * 1000000)
+                  , 'dur'   : int(span.duration * 1000000)
+                  , 'pid'   : pid
+                  , 'tid'   : span.thread_id
+                  , 'args'  : dict((k, unicode(v)) for k, v in span.args.iteritems())
+                })
+        return {'traceEvents' : events, 'displayTimeUnit' : 'ms'}
+    
+    def dump_chrome_trace(self, path):
+        """
+        Write recorded spans to a Chrome trace-event JSON file.
+        ----------------------------------------------
+        @param path         - file to write to.
+        """
+        import json
+        with open(path, 'w') as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+    
+    def summary(self):
+        """
+        Text breakdown of time spent per stage, grouped by the 
+        public API call the stages belong to. Stage times are 
+        self times, i.e. excluding any nested stages. Stages run 
+        concurrently may add up to more than the call's total.
+        """
+        with self._lock:
+            roots = list(self.roots)
+        calls = {}
+        for root in roots:
+            call = calls.setdefault(root.name, {'count' : 0, 'total' : 0.0, 'stages' : {}})
+            call['count'] += 1
+            call['total'] += root.duration
+            for span, depth in self._walk(root):
+                stage = call['stages'].setdefault(span.name, [0, 0.0])
+                stage[0] += 1
+                stage[1] += span.self_duration
+        lines = []
+        for name, call in sorted(calls.items(), key = lambda item: -item[1]['total']):
+            lines.append('%s  calls: %d  total: %.3fms' % (
+                name, call['count'], call['total'] * 1000
+            ))
+            stages = sorted(call['stages'].items(), key = lambda item: -item[1][1])
+            for stage_name, (count, total) in stages:
+                lines.append('    %-32s %6d %12.3fms %6.1f%%' % (
+                    stage_name
+                  , count
+                  , total * 1000
+                  , (100.0 * total / call['total']) if call['total'] else 0.0
+                ))
+        return '\n'.join(lines)
+
+class _PaintPluginMixin(object):
+    """
+    Internal use.
+    Suds plugin reporting transport events back to the client. 
+    Combined with suds' MessagePlugin by _paint_plugin once suds 
+    has been imported.
+    """
+    def __init__(self, client):
+        self.client = client
+    
+    def __deepcopy__(self, memo):
+        # suds deep copies its options, plugins included, when 
+        # cloning a client, the clone should report to the same client
+        return self
+    
+    def sending(self, context):
+        if self.client.profiler is not None:
+            self.client.profiler.mark('sending')
+        if self.client.wire_log is not None:
+            self.client.wire_log.sending(
+                context.envelope
+              , (self.client.api_context, self.client.api_password)
+            )
+    
+    def received(self, context):
+        if self.client.profiler is not None:
+            self.client.profiler.mark('received')
+        if self.client.wire_log is not None:
+            self.client.wire_log.received(context.reply)
+
+_paint_plugin_class = None
+
+def _paint_plugin(client):
+    """
+    Internal use.
+    Build the suds plugin for a client, creating the plugin 
+    class on first use.
+    """
+    global _paint_plugin_class
+    if _paint_plugin_class is None:
+        _paint_plugin_class = type(
+            '_PaintPlugin'
+          , (_PaintPluginMixin, _suds().plugin.MessagePlugin)
+          , {}
+        )
+    return _paint_plugin_class(client)
+
+class _MultiRefPerReply(object):
+    """
+    Internal use.
+    Stands in for the MultiRef of a suds binding, which keeps the 
+    reply it is processing on itself. Bindings belong to the wsdl, 
+    which cloned clients share, so replies received at the same 
+    time on several threads would otherwise get each other's 
+    content; each reply is given a MultiRef of its own instead.
+    """
+    def process(self, body):
+        return _suds().bindings.multiref.MultiRef().process(body)
+
+def _unshare_replies(api_client):
+    """
+    Internal use.
+    Replace the MultiRef of every binding of a suds client's wsdl, 
+    see _MultiRefPerReply.
+    """
+    for service in api_client.wsdl.services:
+        for port in service.ports:
+            for method in port.methods.values():
+                method.binding.input.multiref   = _MultiRefPerReply()
+                method.binding.output.multiref  = _MultiRefPerReply()
+    return api_client
+
+def _profiled(method):
+    """
+    Internal use.
+    Decorator opening a span around a public API method when 
+    the client has a profiler attached.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.profiler is None:
+            return method(self, *args, **kwargs)
+        with self.profiler.span(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class ContactValidator(object):
+    """
+    Columnar pre-upload validation and normalisation of contact data.
+    Rows are split into columns which are then normalised as a whole, 
+    using list operations, or numpy's string operations if asked for. 
+    numpy.char calls the string methods element by element and adds 
+    the array conversions on top, so it is slower than plain lists 
+    and off by default. Rows with an unusable email or mobile, or 
+    with values that are not valid utf-8, are rejected locally 
+    instead of failing the upload server side.
+    Mobiles in international format lose a (0) trunk prefix before 
+    their punctuation is stripped, so that +44 (0)7700 900123 becomes 
+    +447700900123 rather than a wrong number that still looks valid.
+    """
+    EMAIL_PATTERN       = r'^[^@\s",;<>]+@[^@\s",;<>]+\.[^@\s",;<>.]+$'
+    MOBILE_PATTERN      = r'^\+?[0-9]{7,15}$'
+    MOBILE_PUNCTUATION  = (' ', '-', '.', '(', ')')
+    MOBILE_TRUNK_PREFIX = '(0)'
+    
+    class REASONS:
+        INVALID_EMAIL       = 'INVALID_EMAIL'
+        INVALID_MOBILE      = 'INVALID_MOBILE'
+        INVALID_ENCODING    = 'INVALID_ENCODING'
+        NO_ADDRESS          = 'NO_EMAIL_OR_MOBILE'
+    
+    def __init__(self, use_numpy = False):
+        """
+        ----------------------------------------------
+        @param use_numpy    - use numpy if it is installed, which 
+                              benchmarks slower than the default.
+        """
+        import re
+        self.email_re   = re.compile(ContactValidator.EMAIL_PATTERN)
+        self.mobile_re  = re.compile(ContactValidator.MOBILE_PATTERN)
+        self.numpy      = _numpy() if use_numpy else None
+    
+    def _replace(self, column, old, new):
+        if self.numpy is not None:
+            return self.numpy.char.replace(column, old, new)
+        return [value.replace(old, new) for value in column]
+    
+    def _drop_trunk_prefix(self, column):
+        prefix = ContactValidator.MOBILE_TRUNK_PREFIX
+        if self.numpy is not None:
+            return self.numpy.where(
+                self.numpy.char.startswith(self.numpy.char.lstrip(column), '+')
+              , self.numpy.char.replace(column, prefix, '', 1)
+              , column
+            )
+        return [
+            value.replace(prefix, '', 1) if value.lstrip().startswith('+') else value
+            for value in column
+        ]
+    
+    def _strip_lower(self, column):
+        if self.numpy is not None:
+            return self.numpy.char.lower(self.numpy.char.strip(column))
+        return [value.strip().lower() for value in column]
+    
+    def _as_column(self, values):
+        if self.numpy is not None and values:
+            return self.numpy.array(values, dtype = str)
+        return values
+    
+    def _as_list(self, column):
+        if self.numpy is not None and len(column):
+            return column.tolist()
+        return list(column)
+    
+    def _encode_column(self, values):
+        """
+        Encode a column to utf-8 byte strings.
+        Returns the encoded values and the positions of values which 
+        are byte strings but not valid utf-8.
+        """
+        encoded = []
+        invalid = []
+        for position, value in enumerate(values):
+            if isinstance(value, unicode):
+                encoded.append(value.encode('utf-8'))
+            else:
+                try:
+                    value.decode('utf-8')
+                except UnicodeDecodeError:
+                    invalid.append(position)
+                    value = ''
+                encoded.append(value)
+        return encoded, invalid
+    
+    def validate(self, contacts, custom_field_limit = None):
+        """
+        Validate and normalise a list of contact dictionaries.
+        Returns a dictionary holding the normalised valid contacts, 
+        the rejected contacts with their index in the input and the 
+        reasons for rejection, and any custom fields beyond 
+        custom_field_limit which the upload would ignore.
+        ----------------------------------------------
+        @param contacts             - list of dictionaries of contact data.
+        @param custom_field_limit   - number of custom fields allowed by 
+                                      the account level.
+        """
+        email_key   = PureResponseClient.FIELDS.EMAIL
+        mobile_key  = PureResponseClient.FIELDS.MOBILE
+        rows        = [dict(contact) for contact in contacts]
+        reasons     = [[] for row in rows]
+        
+        master = set()
+        for row in rows:
+            master.update(row.keys())
+        
+        for key in master:
+            # only string cells are normalised, anything else is 
+            # converted with str() when the csv is written
+            indices = [
+                index for index, row in enumerate(rows)
+                if isinstance(row.get(key), basestring)
+            ]
+            if not indices:
+                continue
+            values, invalid = self._encode_column([rows[index][key] for index in indices])
+            for position in invalid:
+                reasons[indices[position]].append(ContactValidator.REASONS.INVALID_ENCODING)
+            
+            column = self._as_column(values)
+            column = self._replace(
+                column
+              , PureResponseClient.VALUES.NEW_LINE
+              , PureResponseClient.VALUES.SPACE_STRING
+            )
+            column = self._replace(
+                column
+              , PureResponseClient.VALUES.CARRIAGE_RETURN
+              , PureResponseClient.VALUES.EMPTY_STRING
+            )
+            if key == email_key:
+                column = self._strip_lower(column)
+                pattern, reason = self.email_re, ContactValidator.REASONS.INVALID_EMAIL
+            elif key == mobile_key:
+                column = self._drop_trunk_prefix(column)
+                for punctuation in ContactValidator.MOBILE_PUNCTUATION:
+                    column = self._replace(column, punctuation, PureResponseClient.VALUES.EMPTY_STRING)
+                pattern, reason = self.mobile_re, ContactValidator.REASONS.INVALID_MOBILE
+            else:
+                pattern = None
+            
+            column = self._as_list(column)
+            for position, index in enumerate(indices):
+                rows[index][key] = column[position].decode('utf-8')
+            if pattern is not None:
+                for position, index in enumerate(indices):
+                    if column[position] and not pattern.match(column[position]):
+                        reasons[index].append(reason)
+        
+        for index, row in enumerate(rows):
+            if not (row.get(email_key) or row.get(mobile_key)):
+                reasons[index].append(ContactValidator.REASONS.NO_ADDRESS)
+        
+        valid       = []
+        rejected    = []
+        for index, row in enumerate(rows):
+            if reasons[index]:
+                rejected.append({
+                    'index'     : index
+                  , 'contact'   : contacts[index]
+                  , 'reasons'   : reasons[index]
+                })
+            else:
+                valid.append(row)
+        
+        dropped = []
+        if custom_field_limit is not None:
+            custom = [
+                key for key in sorted(master)
+                if key not in (email_key, mobile_key)
+            ]
+            dropped = custom[custom_field_limit:]
+        
+        return {
+            'contacts'          : valid
+          , 'rejected'          : rejected
+          , 'dropped_fields'    : dropped
+        }
+
+class ContactIndex(object):
+    """
+    Per-list seen-set of uploaded contacts, keyed on the email column 
+    together with a digest of the contact's data, so that contacts 
+    already appended to a list with unchanged data can be dropped 
+    before a request goes out. Contacts without an email are never 
+    considered seen.
+    Uploads claim their contacts with reserve, so that concurrent 
+    uploads of the same contact within a process send it once, and 
+    then either add or release them depending on the outcome.
+    Subclasses implement _contains and _add.
+    """
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._reserved  = set()
+    
+    def _encode(self, value):
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        return str(value)
+    
+    def entry(self, list_name, contact):
+        """
+        Build the (key, digest) pair identifying a contact on a list, 
+        None if the contact has no email.
+        """
+        import hashlib
+        email = contact.get(PureResponseClient.FIELDS.EMAIL)
+        if not email:
+            return None
+        email   = self._encode(email).strip().lower()
+        key     = self._encode(list_name) + '\x00' + email
+        digest  = hashlib.md5('\x1e'.join(
+            self._encode(field) + '\x1f' + (
+                email if field == PureResponseClient.FIELDS.EMAIL 
+                else self._encode(contact[field])
+            )
+            for field in sorted(contact)
+        )).hexdigest()
+        return key, digest
+    
+    def contains(self, list_name, contact):
+        """
+        True if the contact has been added to the list with the same data.
+        ----------------------------------------------
+        @param list_name        - name of the contact list.
+        @param contact          - dictionary of contact data.
+        """
+        entry = self.entry(list_name, contact)
+        if entry is None:
+            return False
+        with self._lock:
+            return self._contains(*entry)
+    
+    def reserve(self, list_name, contact):
+        """
+        Claim a contact for upload to the list. False if it has been 
+        added with the same data or another upload has claimed it, 
+        otherwise the claim lasts until self.add or self.release.
+        ----------------------------------------------
+        @param list_name        - name of the contact list.
+        @param contact          - dictionary of contact data.
+        """
+        entry = self.entry(list_name, contact)
+        if entry is None:
+            return True
+        with self._lock:
+            if (entry in self._reserved) or self._contains(*entry):
+                return False
+            self._reserved.add(entry)
+            return True
+    
+    def release(self, list_name, contact):
+        """
+        Give up the claim on a contact whose upload failed.
+        ----------------------------------------------
+        @param list_name        - name of the contact list.
+        @param contact          - dictionary of contact data.
+        """
+        entry = self.entry(list_name, contact)
+        if entry is not None:
+            with self._lock:
+                self._reserved.discard(entry)
+    
+    def add(self, list_name, contact):
+        """
+        Record a contact as uploaded to the list.
+        ----------------------------------------------
+        @param list_name        - name of the contact list.
+        @param contact          - dictionary of contact data.
+        """
+        entry = self.entry(list_name, contact)
+        if entry is not None:
+            with self._lock:
+                self._add(*entry)
+                self._reserved.discard(entry)
+    
+    def _contains(self, key, digest):
+        raise NotImplementedError
+    
+    def _add(self, key, digest):
+        raise NotImplementedError
+
+class BloomContactIndex(ContactIndex):
+    """
+    Bounded in-memory ContactIndex backed by a Bloom filter.
+    False positives (a new or changed contact being dropped) occur 
+    at roughly error_rate. Once capacity contacts have been added 
+    the filter is cleared rather than letting the error rate grow.
+    """
+    def __init__(self, capacity = 1000000, error_rate = 0.001):
+        """
+        ----------------------------------------------
+        @param capacity         - number of contacts to hold before clearing.
+        @param error_rate       - acceptable false positive rate.
+        """
+        import math
+        super(BloomContactIndex, self).__init__()
+        self.capacity   = capacity
+        self.size       = int(math.ceil(
+            -capacity * math.log(error_rate) / (math.log(2) ** 2)
+        ))
+        self.hashes     = max(1, int(round(self.size * math.log(2) / capacity)))
+        self.clear()
+    
+    def clear(self):
+        self.bits   = bytearray((self.size + 7) // 8)
+        self.count  = 0
+    
+    def _positions(self, key, digest):
+        import hashlib
+        import struct
+        first, second = struct.unpack(
+            '<QQ'
+          , hashlib.md5(key + '\x00' + digest).digest()
+        )
+        for i in xrange(self.hashes):
+            yield (first + i * second) % self.size
+    
+    def _contains(self, key, digest):
+        for position in self._positions(key, digest):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+    
+    def _add(self, key, digest):
+        if self.count >= self.capacity:
+            self.clear()
+        for position in self._positions(key, digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+class DbmContactIndex(ContactIndex):
+    """
+    Persistent on-disk ContactIndex backed by anydbm, mapping list 
+    name and email to the digest of the last uploaded contact data.
+    """
+    def __init__(self, path):
+        """
+        ----------------------------------------------
+        @param path             - database file, created if missing.
+        """
+        import anydbm
+        super(DbmContactIndex, self).__init__()
+        self.db = anydbm.open(path, 'c')
+    
+    def _contains(self, key, digest):
+        return self.db.has_key(key) and (self.db[key] == digest)
+    
+    def _add(self, key, digest):
+        self.db[key] = digest
+    
+    def sync(self):
+        with self._lock:
+            if hasattr(self.db, 'sync'):
+                self.db.sync()
+    
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+# open batchers, closed at interpreter exit; a batcher leaves the 
+# set when it is closed so that it can be collected
+_batchers = weakref.WeakSet()
+
+def _close_batchers():
+    for batcher in list(_batchers):
+        batcher.close()
+
+atexit.register(_close_batchers)
+
+class ContactBatcher(object):
+    """
+    Buffers contacts per list and uploads each buffer with a single 
+    api_add_contacts call once it holds max_contacts contacts, roughly 
+    max_bytes of data, or its oldest contact has waited max_delay 
+    seconds. Safe to use from several threads; uploads triggered by 
+    size happen on the thread adding the contact, uploads triggered 
+    by time on a background thread. Remaining contacts are uploaded 
+    on close, which also runs at interpreter exit for batchers not 
+    closed by then. Exceptions raised by on_flush are logged.
+    """
+    def __init__(self, client, max_contacts = 1000, max_bytes = 1048576
+        , max_delay = 5.0, validate = False, on_flush = None):
+        """
+        ----------------------------------------------
+        @param client           - authenticated PureResponseClient.
+        @param max_contacts     - contacts per upload.
+        @param max_bytes        - approximate data size per upload.
+        @param max_delay        - seconds a contact may wait to be uploaded.
+        @param validate         - passed on to api_add_contacts.
+        @param on_flush         - [optional] callable receiving list_name, 
+                                  contacts and the api_add_contacts 
+                                  response after each upload.
+        """
+        self.client         = client
+        self.max_contacts   = max_contacts
+        self.max_bytes      = max_bytes
+        self.max_delay      = max_delay
+        self.validate       = validate
+        self.on_flush       = on_flush
+        self._buffers       = {}
+        self._condition     = threading.Condition()
+        self._closed        = False
+        self._thread        = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        _batchers.add(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def _size(self, contact):
+        size = 0
+        for key, value in contact.iteritems():
+            size += len(key) + len(value if isinstance(value, basestring) else str(value))
+        return size
+    
+    def add(self, list_name, contact, notify_uri = None):
+        """
+        Queue a contact to be appended to a list.
+        Returns the upload response if adding the contact filled the 
+        buffer, None otherwise.
+        ----------------------------------------------
+        @param list_name        - name of contact list to append to.
+        @param contact          - dictionary of contact data.
+        @param notify_uri       - passed on to api_add_contacts.
+        """
+        key = (list_name, notify_uri)
+        with self._condition:
+            if self._closed:
+                raise Exception(PureResponseClient.ERRORS.BATCHER_CLOSED)
+            buffer_ = self._buffers.get(key)
+            if buffer_ is None:
+                buffer_ = self._buffers[key] = {
+                    'contacts'  : []
+                  , 'bytes'     : 0
+                  , 'deadline'  : time.time() + self.max_delay
+                }
+                self._condition.notify()
+            buffer_['contacts'].append(contact)
+            buffer_['bytes'] += self._size(contact)
+            full = ((len(buffer_['contacts']) >= self.max_contacts) 
+                or (buffer_['bytes'] >= self.max_bytes))
+            if full:
+                del self._buffers[key]
+        if full:
+            return self._upload(key, buffer_['contacts'])
+        return None
+    
+    def flush(self):
+        """
+        Upload all buffered contacts now.
+        Returns a list of the api_add_contacts responses.
+        """
+        with self._condition:
+            buffers         = self._buffers
+            self._buffers   = {}
+        return [
+            self._upload(key, buffer_['contacts'])
+            for key, buffer_ in buffers.iteritems()
+        ]
+    
+    def close(self):
+        """
+        Stop the background thread and upload all buffered contacts.
+        """
+        with self._condition:
+            if self._closed:
+                return []
+            self._closed = True
+            self._condition.notify()
+        _batchers.discard(self)
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.flush()
+    
+    def _upload(self, key, contacts):
+        list_name, notify_uri = key
+        try:
+            response = self.client.api_add_contacts(
+                list_name
+              , contacts
+              , notify_uri
+              , self.validate
+            )
+        except Exception, e:
+            response = self.client._dict_err(PureResponseClient.ERRORS.GENERIC, e)
+        if self.on_flush is not None:
+            try:
+                self.on_flush(list_name, contacts, response)
+            except Exception:
+                _log_exception('ContactBatcher on_flush failed for %r', list_name)
+        return response
+    
+    def _run(self):
+        """
+        Internal use.
+        Background loop uploading buffers once their deadline passes.
+        """
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.time()
+                    due = [
+                        key for key, buffer_ in self._buffers.iteritems()
+                        if buffer_['deadline'] <= now
+                    ]
+                    if due:
+                        break
+                    deadlines = [buffer_['deadline'] for buffer_ in self._buffers.itervalues()]
+                    self._condition.wait(
+                        (min(deadlines) - now) if deadlines else None
+                    )
+                if self._closed:
+                    return
+                buffers = [(key, self._buffers.pop(key)) for key in due]
+            for key, buffer_ in buffers:
+                self._upload(key, buffer_['contacts'])
+
+class ImportCheckpoint(object):
+    """
+    Progress of a chunked contact import, kept in a json file in 
+    directory, which is created if need be and must be writable 
+    before anything is uploaded. The file is named after the list name and a digest 
+    of the input and chunk size, so an interrupted import of the 
+    same contacts resumes after its last acknowledged chunk while 
+    any other input starts from the first chunk.
+    """
+    def __init__(self, directory, list_name, contacts, chunk_size):
+        """
+        ----------------------------------------------
+        @param directory    - directory holding checkpoint files.
+        @param list_name    - name of the contact list imported to.
+        @param contacts     - list of dictionaries being imported.
+        @param chunk_size   - number of contacts per chunk.
+        """
+        import errno
+        import hashlib
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another import may have created it meanwhile
+                if not os.path.isdir(directory):
+                    raise
+        if not os.access(directory, os.W_OK):
+            raise IOError(errno.EACCES, os.strerror(errno.EACCES), directory)
+        self.list_name      = list_name
+        self.chunk_size     = chunk_size
+        self.chunks         = (len(contacts) + chunk_size - 1) // chunk_size
+        self.digest         = ImportCheckpoint.digest_contacts(contacts, chunk_size)
+        self.path           = os.path.join(
+            directory
+          , 'import-%s.json' % hashlib.sha1(
+                list_name.encode('utf-8') + '\0' + self.digest
+            ).hexdigest()
+        )
+        self.acknowledged   = 0
+        self.load()
+    
+    @staticmethod
+    def digest_contacts(contacts, chunk_size):
+        """
+        Digest of the contacts, in order, and chunk size.
+        ----------------------------------------------
+        @param contacts     - list of dictionaries.
+        @param chunk_size   - number of contacts per chunk.
+        """
+        import hashlib
+        digest = hashlib.sha1(str(chunk_size))
+        for contact in contacts:
+            digest.update(repr(sorted(contact.iteritems())))
+        return digest.hexdigest()
+    
+    def load(self):
+        import json
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as checkpoint_file:
+            data = json.load(checkpoint_file)
+        if (data.get('digest') == self.digest) and (data.get('chunks') == self.chunks):
+            self.acknowledged = data['acknowledged']
+    
+    def save(self):
+        """
+        Write the checkpoint through a temporary file, so that an 
+        interrupted write leaves the previous checkpoint in place.
+        """
+        import json
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as checkpoint_file:
+            json.dump({
+                'list_name'     : self.list_name
+              , 'digest'        : self.digest
+              , 'chunk_size'    : self.chunk_size
+              , 'chunks'        : self.chunks
+              , 'acknowledged'  : self.acknowledged
+            }, checkpoint_file)
+        os.rename(temporary, self.path)
+    
+    def acknowledge(self, chunk):
+        """
+        Record that the server confirmed chunk, and all before it.
+        ----------------------------------------------
+        @param chunk        - index of the chunk.
+        """
+        self.acknowledged = chunk + 1
+        self.save()
+    
+    def discard(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def _response_failed(response):
+    """
+    Internal use.
+    Default failure test for RequestGraph steps returning 
+    _dict_ok / _dict_err style responses.
+    """
+    return isinstance(response, dict) and (response.get('ok') is False)
+
+class RequestGraph(object):
+    """
+    Small dependency graph of request steps. Each step is a callable 
+    receiving the dictionary of results so far, and runs as soon as 
+    the steps it depends on have completed, so independent branches 
+    run concurrently. Once a step fails no further steps are started, 
+    and an exception raised by a step is re-raised by run.
+    The start, end and duration of each step are recorded in 
+    self.timings, and as spans when a profiler is supplied.
+    Steps are queued on the given thread pool, or on a thread each, 
+    and while waiting run takes back queued steps which have not 
+    started and runs them on the calling thread. A step may itself 
+    run a graph on the same pool, and a busy pool degrades to 
+    running the steps in turn rather than waiting behind others.
+    """
+    def __init__(self, profiler = None, activate = None):
+        """
+        ----------------------------------------------
+        @param profiler     - [optional] Profiler to record steps in.
+        @param activate     - [optional] callable taking the profiler and 
+                              returning a context manager entered around 
+                              each step on its thread.
+        """
+        self.profiler   = profiler
+        self._activate  = activate or (lambda profiler: _NULL_SPAN)
+        self.steps      = []
+        self.results    = {}
+        self.timings    = {}
+        self._funcs     = {}
+        self._depends   = {}
+        self._failed    = {}
+    
+    def add(self, name, func, depends = (), failed = _response_failed):
+        """
+        Add a step to the graph.
+        ----------------------------------------------
+        @param name         - unique name of the step.
+        @param func         - callable taking the results dictionary.
+        @param depends      - names of previously added steps which 
+                              must complete first.
+        @param failed       - callable telling whether the step's 
+                              result is a failure.
+        """
+        if (name in self._funcs) or any(step not in self._funcs for step in depends):
+            raise Exception(PureResponseClient.ERRORS.INVALID_PARAMS)
+        self.steps.append(name)
+        self._funcs[name]   = func
+        self._depends[name] = tuple(depends)
+        self._failed[name]  = failed
+        return self
+    
+    def failed(self):
+        """
+        Name of the first failed step in the order steps were added, 
+        None if no step failed.
+        """
+        for name in self.steps:
+            if (name in self.results) and self._failed[name](self.results[name]):
+                return name
+        return None
+    
+    def run(self, pool = None):
+        """
+        Run the graph, returning the results of the completed steps.
+        ----------------------------------------------
+        @param pool         - [optional] ThreadPool to run steps on.
+        """
+        condition   = threading.Condition()
+        pending     = list(self.steps)
+        running     = set()
+        queued      = []
+        state       = {'stop' : False, 'error' : None}
+        parent      = self.profiler.current() if self.profiler is not None else None
+        
+        def call(name):
+            if parent is None:
+                return self._funcs[name](self.results)
+            with self.profiler.attach(parent):
+                with self._activate(self.profiler):
+                    with self.profiler.span(name):
+                        return self._funcs[name](self.results)
+        
+        def execute(name):
+            start = time.time()
+            error = None
+            try:
+                result = call(name)
+                end = time.time()
+                failed = self._failed[name](result)
+            except Exception:
+                error = sys.exc_info()
+            with condition:
+                try:
+                    if error is not None:
+                        state['error'] = state['error'] or error
+                        state['stop'] = True
+                    else:
+                        self.results[name] = result
+                        self.timings[name] = {
+                            'start'     : start
+                          , 'end'       : end
+                          , 'duration'  : end - start
+                          , 'thread'    : threading.current_thread().name
+                        }
+                        if failed:
+                            state['stop'] = True
+                finally:
+                    # always let run() see the step finish, else it 
+                    # would wait forever
+                    running.discard(name)
+                    condition.notify_all()
+        
+        def claim(name):
+            # a queued step runs on whichever thread claims it first
+            with condition:
+                if name not in queued:
+                    return
+                queued.remove(name)
+            execute(name)
+        
+        with condition:
+            while True:
+                if state['stop']:
+                    # steps still queued are never started
+                    for name in queued:
+                        running.discard(name)
+                    del queued[:]
+                else:
+                    ready = [
+                        name for name in pending
+                        if all(step in self.results for step in self._depends[name])
+                    ]
+                    for name in ready:
+                        pending.remove(name)
+                        running.add(name)
+                        queued.append(name)
+                        if pool is not None:
+                            pool.apply_async(claim, (name,))
+                        else:
+                            thread = threading.Thread(target = claim, args = (name,))
+                            thread.daemon = True
+                            thread.start()
+                if not running:
+                    break
+                if queued:
+                    name = queued.pop(0)
+                    condition.release()
+                    try:
+                        execute(name)
+                    finally:
+                        condition.acquire()
+                    continue
+                condition.wait()
+        
+        if state['error'] is not None:
+            error = state['error']
+            raise error[0], error[1], error[2]
+        return self.results
+
+class MessageBody(object):
+    """
+    Source of an email message body for api_create_email, read from 
+    a file, a string or an iterable of chunks. The body is base64 
+    encoded chunk by chunk as it is read, so that large bodies are 
+    never held as unicode, utf-8 and base64 copies at the same time, 
+    and a sha1 digest of its content is computed along the way.
+    """
+    CHUNK_SIZE = 3 * 65536 # multiple of 3 so encoded chunks concatenate
+    
+    def __init__(self, open_chunks, repeatable = True):
+        """
+        Use one of the from_* constructors.
+        ----------------------------------------------
+        @param open_chunks  - callable returning an iterator of chunks.
+        @param repeatable   - whether open_chunks may be called again.
+        """
+        self._open_chunks   = open_chunks
+        self._repeatable    = repeatable
+        self._digest        = None
+        self._encoded       = None
+    
+    @classmethod
+    def from_file(cls, path):
+        """
+        ----------------------------------------------
+        @param path         - file holding the (utf-8) html body.
+        """
+        def open_chunks():
+            with open(path, 'rb') as body_file:
+                while True:
+                    chunk = body_file.read(cls.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        return cls(open_chunks)
+    
+    @classmethod
+    def from_string(cls, body):
+        """
+        ----------------------------------------------
+        @param body         - html body, unicode or utf-8 bytes.
+        """
+        return cls(lambda: iter([body]))
+    
+    @classmethod
+    def from_iterable(cls, chunks):
+        """
+        Body from an iterable of chunks, which is consumed once.
+        ----------------------------------------------
+        @param chunks       - iterable of unicode or utf-8 byte strings.
+        """
+        return cls(lambda: iter(chunks), repeatable = False)
+    
+    def _byte_chunks(self):
+        for chunk in self._open_chunks():
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode('utf-8')
+            yield chunk
+    
+    def digest(self):
+        """
+        Hex sha1 digest of the body. Reads a repeatable body without 
+        keeping it, a single use body is encoded and kept instead.
+        """
+        import hashlib
+        if self._digest is None:
+            if self._repeatable:
+                sha1 = hashlib.sha1()
+                for chunk in self._byte_chunks():
+                    sha1.update(chunk)
+                self._digest = sha1.hexdigest()
+            else:
+                self.encode()
+        return self._digest
+    
+    def encode(self):
+        """
+        Base64 encoded body, ready to be sent as a _base64 field.
+        """
+        import hashlib
+        if self._encoded is not None:
+            return self._encoded
+        b64encode   = _base64().b64encode
+        sha1        = hashlib.sha1()
+        pieces      = []
+        remainder   = ''
+        for chunk in self._byte_chunks():
+            sha1.update(chunk)
+            if remainder:
+                chunk = remainder + chunk
+            cut         = len(chunk) - (len(chunk) % 3)
+            remainder   = chunk[cut:]
+            if cut:
+                pieces.append(b64encode(chunk[:cut]))
+        if remainder:
+            pieces.append(b64encode(remainder))
+        self._digest = sha1.hexdigest()
+        encoded = ''.join(pieces)
+        if not self._repeatable:
+            self._encoded = encoded
+        return encoded
+
+class Catalog(object):
+    """
+    Local index of the contact lists and email messages on an 
+    account, mapping names to their ids and loaded metadata. 
+    Filled by PureResponseClient.api_refresh_catalog and used by 
+    the client to answer name lookups without a SEARCH.
+    Only names found in the index are trusted, a name missing from 
+    it may have been created since the last refresh and is looked 
+    up by a SEARCH. The index belongs to the account it was 
+    refreshed with and is not used by clients of other accounts.
+    Entries are considered fresh for max_age seconds after a 
+    refresh, stale entries are only used if serve_stale is set 
+    and trigger a refresh in the background either way. After a 
+    failed refresh no other is triggered for retry_interval seconds.
+    """
+    LISTS       = 'lists'
+    MESSAGES    = 'messages'
+    
+    def __init__(self, max_age = 300, serve_stale = False, path = None
+        , retry_interval = 60):
+        """
+        ----------------------------------------------
+        @param max_age          - seconds a refresh is considered fresh.
+        @param serve_stale      - answer lookups from a stale index while 
+                                  it is refreshed in the background.
+        @param path             - [optional] json file the index is saved 
+                                  to after each refresh and loaded from 
+                                  on construction.
+        @param retry_interval   - seconds to wait after a failed refresh 
+                                  before triggering another.
+        """
+        self.max_age        = max_age
+        self.serve_stale    = serve_stale
+        self.path           = path
+        self.retry_interval = retry_interval
+        self.refreshed      = None
+        self.refreshing     = False
+        self.failed         = None
+        self.account        = None
+        self.entries        = {Catalog.LISTS : {}, Catalog.MESSAGES : {}}
+        self._lock          = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load()
+    
+    def is_stale(self):
+        return (self.refreshed is None) or (time.time() - self.refreshed > self.max_age)
+    
+    def is_usable(self, account = None):
+        """
+        Whether lookups for account may be answered from the index.
+        ----------------------------------------------
+        @param account          - username of the account looking up.
+        """
+        return (self.refreshed is not None) and (self.account == account) and (
+            self.serve_stale or not self.is_stale())
+    
+    def needs_refresh(self, account = None):
+        """
+        Whether a lookup for account should trigger a refresh: the 
+        index is stale or belongs to another account, and no refresh 
+        failed within the last retry_interval seconds.
+        ----------------------------------------------
+        @param account          - username of the account looking up.
+        """
+        if (self.failed is not None) and (time.time() - self.failed < self.retry_interval):
+            return False
+        return self.is_stale() or (self.account != account)
+    
+    def refresh_failed(self):
+        """
+        Record a failed refresh, holding off the next one.
+        """
+        self.failed = time.time()
+    
+    def get(self, kind, name):
+        """
+        Entry for a name, None if the name is not in the index.
+        ----------------------------------------------
+        @param kind             - Catalog.LISTS or Catalog.MESSAGES.
+        @param name             - list or message name.
+        """
+        with self._lock:
+            return self.entries[kind].get(unicode(name))
+    
+    def put(self, kind, name, entry):
+        with self._lock:
+            self.entries[kind][unicode(name)] = entry
+    
+    def discard(self, kind, name):
+        with self._lock:
+            self.entries[kind].pop(unicode(name), None)
+    
+    def replace(self, lists, messages, account = None):
+        """
+        Replace the whole index with the outcome of a refresh.
+        ----------------------------------------------
+        @param lists            - dictionary of list name to entry.
+        @param messages         - dictionary of message name to entry.
+        @param account          - username of the account refreshed.
+        """
+        with self._lock:
+            self.entries = {Catalog.LISTS : lists, Catalog.MESSAGES : messages}
+            self.refreshed = time.time()
+            self.account = account
+            self.failed = None
+        if self.path is not None:
+            self.save()
+    
+    def save(self):
+        """
+        Write the index through a temporary file, so that an 
+        interrupted write leaves the previous index in place.
+        """
+        import json
+        temporary = self.path + '.tmp'
+        with self._lock:
+            data = {
+                'refreshed' : self.refreshed
+              , 'account'   : self.account
+              , 'entries'   : self.entries
+            }
+            with open(temporary, 'w') as catalog_file:
+                json.dump(data, catalog_file)
+            os.rename(temporary, self.path)
+    
+    def load(self):
+        import json
+        with open(self.path) as catalog_file:
+            data = json.load(catalog_file)
+        with self._lock:
+            self.refreshed  = data['refreshed']
+            self.account    = data.get('account')
+            self.entries    = data['entries']
+
+class DeliveryFuture(object):
+    """
+    Outcome of a tracked campaign delivery, modelled on 
+    concurrent.futures.Future. Resolves with the loaded delivery 
+    entity once its status is final, or with the error response 
+    if its status could not be loaded.
+    """
+    def __init__(self, bean_id):
+        self.bean_id    = bean_id
+        self.status     = None
+        self._response  = None
+        self._done      = threading.Event()
+        self._callbacks = []
+        self._lock      = threading.Lock()
+    
+    def done(self):
+        return self._done.is_set()
+    
+    def result(self, timeout = None):
+        """
+        Wait for the delivery to complete and return the response, 
+        None if timeout seconds pass first.
+        """
+        self._done.wait(timeout)
+        return self._response
+    
+    def add_done_callback(self, callback):
+        """
+        Call callback(future) on completion, or now if already complete.
+        """
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+    
+    def _resolve(self, response):
+        with self._lock:
+            self._response = response
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+class DeliveryTracker(object):
+    """
+    Tracks campaign deliveries stored by api_send_to_list until they 
+    reach a final status. Due deliveries are polled in batches of up 
+    to batch_size, with the LOADs of a batch made concurrently. Each 
+    delivery is polled again after an interval which starts at 
+    min_interval, grows by backoff while its status is unchanged, up 
+    to max_interval, and drops back to min_interval when it changes.
+    Deliveries are loaded by their deliveryId when the store returned 
+    one. Otherwise they are loaded by bean id, which only identifies 
+    the delivery within the context it was created in, so they are 
+    resolved with ERROR_CONTEXT_CHANGED once the client authenticates 
+    again. Deliveries still not final after max_age seconds are 
+    resolved with ERROR_TRACKING_EXPIRED.
+    Completion is reported through DeliveryFuture objects, callbacks 
+    and the as_completed iterator.
+    """
+    def __init__(self, client, status_field = None, final_statuses = None
+        , batch_size = 20, min_interval = 5.0, max_interval = 300.0
+        , backoff = 2.0, max_failures = 5, max_age = 86400.0):
+        """
+        ----------------------------------------------
+        @param client           - authenticated PureResponseClient.
+        @param status_field     - field of the loaded delivery holding 
+                                  its status.
+        @param final_statuses   - statuses after which a delivery is no 
+                                  longer polled.
+        @param batch_size       - deliveries polled per batch.
+        @param min_interval     - initial seconds between polls.
+        @param max_interval     - maximum seconds between polls.
+        @param backoff          - factor the interval grows by.
+        @param max_failures     - consecutive failed LOADs after which a 
+                                  delivery is resolved with the error.
+        @param max_age          - seconds after which a delivery is no 
+                                  longer polled.
+        """
+        self.client         = client
+        self.status_field   = status_field or PureResponseClient.FIELDS.DELIVERY_STATUS
+        self.final_statuses = set(final_statuses or PureResponseClient.VALUES.DELIVERY_FINAL)
+        self.batch_size     = batch_size
+        self.min_interval   = min_interval
+        self.max_interval   = max_interval
+        self.backoff        = backoff
+        self.max_failures   = max_failures
+        self.max_age        = max_age
+        self._closed        = False
+        self._start()
+    
+    def _start(self):
+        """
+        Internal use.
+        Set up the tracking state and start the poller thread.
+        """
+        import Queue
+        self._tracked       = {}
+        self._completed     = Queue.Queue()
+        self._consumers     = 0
+        self._condition     = threading.Condition()
+        self._thread        = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        if not self._closed:
+            self._thread.start()
+    
+    def _reset_after_fork(self):
+        """
+        Internal use.
+        Start afresh in a child process, which inherits neither the 
+        poller thread nor a usable lock. Deliveries tracked by the 
+        parent stay with the parent, their futures are left 
+        unresolved in the child.
+        """
+        self._start()
+    
+    def track(self, bean_id, callback = None, delivery_id = None):
+        """
+        Start tracking a delivery, returning its DeliveryFuture.
+        ----------------------------------------------
+        @param bean_id          - bean id of the stored delivery.
+        @param callback         - [optional] called with the future on 
+                                  completion.
+        @param delivery_id      - [optional] deliveryId of the stored 
+                                  delivery, valid in any context.
+        """
+        self.client._check_fork()
+        with self._condition:
+            delivery = self._tracked.get(bean_id)
+            if delivery is None:
+                future = DeliveryFuture(bean_id)
+                future.add_done_callback(self._queue_completed)
+                now = time.time()
+                delivery = self._tracked[bean_id] = {
+                    'future'        : future
+                  , 'interval'      : self.min_interval
+                  , 'due'           : now + self.min_interval
+                  , 'failures'      : 0
+                  , 'expires'       : now + self.max_age
+                  , 'delivery_id'   : delivery_id
+                  , 'context'       : self.client.api_context
+                }
+                self._condition.notify()
+        if callback is not None:
+            delivery['future'].add_done_callback(callback)
+        return delivery['future']
+    
+    def pending(self):
+        with self._condition:
+            return len(self._tracked)
+    
+    def as_completed(self, timeout = None):
+        """
+        Iterate over futures as their deliveries complete, until none 
+        are being tracked or timeout seconds pass without completion.
+        Only deliveries completing while an iteration is under way 
+        are queued for it, so completions are not kept for callers 
+        relying on futures and callbacks alone.
+        """
+        import Queue
+        with self._condition:
+            self._consumers += 1
+        try:
+            while True:
+                try:
+                    yield self._completed.get(timeout = 0.1 if timeout is None else timeout)
+                except Queue.Empty:
+                    if (timeout is not None) or (self._completed.empty() and not self.pending()):
+                        return
+        finally:
+            with self._condition:
+                self._consumers -= 1
+                if not self._consumers:
+                    # nobody is left to collect what was queued
+                    while not self._completed.empty():
+                        self._completed.get_nowait()
+    
+    def _queue_completed(self, future):
+        """
+        Internal use.
+        Queue a completed future for the as_completed iterations 
+        under way, if any.
+        """
+        with self._condition:
+            if self._consumers:
+                self._completed.put(future)
+    
+    def close(self):
+        """
+        Stop polling, leaving unfinished futures unresolved.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread.is_alive() and (self._thread is not threading.current_thread()):
+            self._thread.join()
+    
+    def _poll(self, bean_id, delivery_id):
+        if delivery_id is not None:
+            entity_data = {PureResponseClient.FIELDS.DELIVERY_ID : delivery_id}
+        else:
+            entity_data = {PureResponseClient.FIELDS.BEAN_ID : bean_id}
+        return self.client.api_make_request(
+            PureResponseClient.BEAN_TYPES.FACADE
+          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
+          , PureResponseClient.BEAN_PROCESSES.LOAD
+          , entity_data
+        )
+    
+    def _resolve(self, bean_id, response):
+        """
+        Internal use.
+        Stop tracking a delivery and resolve its future with response.
+        """
+        with self._condition:
+            delivery = self._tracked.pop(bean_id, None)
+        if delivery is not None:
+            delivery['future']._resolve(response)
+    
+    def _unpollable(self, delivery):
+        """
+        Internal use.
+        Error a delivery is resolved with instead of being polled, 
+        None if it can be polled.
+        """
+        if time.time() >= delivery['expires']:
+            return PureResponseClient.ERRORS.TRACKING_EXPIRED
+        if (delivery['delivery_id'] is None) and (
+            delivery['context'] != self.client.api_context):
+            return PureResponseClient.ERRORS.CONTEXT_CHANGED
+        return None
+    
+    def _update(self, bean_id, response):
+        """
+        Internal use.
+        Apply the outcome of polling a delivery and reschedule it.
+        """
+        client = self.client
+        with self._condition:
+            delivery = self._tracked.get(bean_id)
+            if delivery is None:
+                return
+            future = delivery['future']
+            resolve = None
+            if client._result_success(response):
+                output = client._response_data(
+                    response
+                  , PureResponseClient.BEAN_TYPES.ENTITY
+                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
+                )
+                status = output.get(self.status_field)
+                delivery['failures'] = 0
+                if status in self.final_statuses:
+                    resolve = client._dict_ok(output)
+                elif status != future.status:
+                    delivery['interval'] = self.min_interval
+                else:
+                    delivery['interval'] = min(
+                        delivery['interval'] * self.backoff
+                      , self.max_interval
+                    )
+                future.status = status
+            else:
+                delivery['failures'] += 1
+                if delivery['failures'] >= self.max_failures:
+                    resolve = response
+                delivery['interval'] = min(
+                    delivery['interval'] * self.backoff
+                  , self.max_interval
+                )
+            delivery['due'] = time.time() + delivery['interval']
+            if resolve is not None:
+                del self._tracked[bean_id]
+        if resolve is not None:
+            future._resolve(resolve)
+    
+    def _run(self):
+        """
+        Internal use.
+        Background loop polling due deliveries in batches.
+        """
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.time()
+                    due = sorted(
+                        (delivery['due'], bean_id)
+                        for bean_id, delivery in self._tracked.iteritems()
+                        if delivery['due'] <= now
+                    )
+                    if due:
+                        break
+                    deadlines = [delivery['due'] for delivery in self._tracked.itervalues()]
+                    self._condition.wait(
+                        (min(deadlines) - now) if deadlines else None
+                    )
+                if self._closed:
+                    return
+            for start in xrange(0, len(due), self.batch_size):
+                try:
+                    self._poll_batch([bean_id for _, bean_id in due[start:start + self.batch_size]])
+                except Exception:
+                    # keep the single poller thread alive whatever happens
+                    _log_exception('DeliveryTracker failed to poll deliveries')
+    
+    def _poll_batch(self, batch):
+        """
+        Internal use.
+        Poll a batch of due deliveries concurrently and apply the 
+        outcomes, resolving deliveries which can no longer be polled.
+        """
+        client  = self.client
+        graph   = client.api_flow()
+        polled  = []
+        for bean_id in batch:
+            with self._condition:
+                delivery = self._tracked.get(bean_id)
+                if delivery is None:
+                    continue
+                error = self._unpollable(delivery)
+                delivery_id = delivery['delivery_id']
+            if error is not None:
+                self._resolve(bean_id, client._dict_err(error, bean_id))
+                continue
+            graph.add(
+                bean_id
+              , lambda results, bean_id = bean_id, delivery_id = delivery_id: (
+                    self._poll(bean_id, delivery_id)
+                )
+              , failed = lambda response: False
+            )
+            polled.append(bean_id)
+        if not polled:
+            return
+        try:
+            results = graph.run(client.api_flow_pool())
+        except Exception, e:
+            results = dict(
+                (bean_id, client._dict_err(PureResponseClient.ERRORS.GENERIC, e))
+                for bean_id in polled
+            )
+        for bean_id in polled:
+            try:
+                self._update(bean_id, results[bean_id])
+            except Exception, e:
+                _log_exception('DeliveryTracker failed to update delivery %r', bean_id)
+                self._resolve(bean_id, client._dict_err(PureResponseClient.ERRORS.GENERIC, e))
+
+class ClientConfig(object):
+    """
+    Picklable description of a PureResponseClient, for handing to 
+    multiprocessing or ProcessPoolExecutor workers. Each worker turns 
+    it into its own client with create_client, which builds its suds 
+    client and authenticates lazily on its first request.
+    Stateful options (catalog, contact_index, message_hashes, 
+    isolation, wire_log) belong to a process and are not carried, 
+    workers set up their own.
+    """
+    def __init__(self, api_username = '', api_password = ''
+        , api_account_level = None, api_version = None
+        , coalesce_requests = True, profile = False
+        , track_deliveries = False):
+        """
+        ----------------------------------------------
+        @param api_username         - username.
+        @param api_password         - password.
+        @param api_account_level    - account level, lite / pro / expert.
+        @param api_version          - wsdl location of the API.
+        @param coalesce_requests    - see PureResponseClient.
+        @param profile              - see PureResponseClient.
+        @param track_deliveries     - see PureResponseClient.
+        """
+        self.api_username       = api_username
+        self.api_password       = api_password
+        self.api_account_level  = api_account_level or PureResponseClient.VALUES.ACCOUNT_LEVEL_LITE
+        self.api_version        = api_version or PureResponseClient.API.RPC_LITERAL_UNBRANDED
+        self.coalesce_requests  = coalesce_requests
+        self.profile            = profile
+        self.track_deliveries   = track_deliveries
+    
+    def create_client(self):
+        """
+        New client for this configuration, authenticating on its first 
+        request if credentials were supplied.
+        """
+        client = PureResponseClient(
+            self.api_version
+          , coalesce_requests   = self.coalesce_requests
+          , profile             = self.profile
+          , track_deliveries    = self.track_deliveries
+        )
+        if self.api_username and self.api_password:
+            client._credentials = (
+                self.api_username
+              , self.api_password
+              , self.api_account_level
+            )
+            client.api_account_level = self.api_account_level
+        return client
+
+def _client_from_config(config):
+    """
+    Internal use.
+    Unpickle a PureResponseClient from its ClientConfig.
+    """
+    return config.create_client()
+
+# clients reset in a child process after a fork, see _reset_after_fork
+_clients = weakref.WeakSet()
+
+def _after_fork_in_child():
+    for client in list(_clients):
+        client._reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = _after_fork_in_child)
 
 class PureResponseClient(object):
     version = '1.1.2' #major.minor.patch
@@ -23,7 +2338,22 @@ class PureResponseClient(object):
     api_username    = None
     api_password    = None
     api_context     = None
-    api_client      = None
+    api_version     = None
+    validator       = None
+    contact_index   = None
+    catalog         = None
+    _api_client     = None
+    _api_client_thread = None
+    _flow_pool      = None
+    message_hashes  = None
+    delivery_tracker = None
+    wire_log        = None
+    isolation       = None
+    _credentials    = None
+    _pid            = None
+    flow_concurrency = 4
+    coalescer       = None
+    _profiler       = None
     
     class API:
         RPC_LITERAL_BRANDED     = 'http://paint.pure360.com/paint.pure360.com/ctrlPaintLiteral.wsdl'
@@ -77,6 +2407,8 @@ class PureResponseClient(object):
         LIST_ID             = 'listId'
         LIST_NAME           = 'listName'
         DELIVERY_TIME       = 'deliveryDtTm'
+        DELIVERY_STATUS     = 'status'
+        DELIVERY_ID         = 'deliveryId'
         FOUND_DATA          = 'idData'
         RESULT              = 'result'
         RESULT_DATA         = 'resultData'
@@ -105,13 +2437,17 @@ class PureResponseClient(object):
         ACCOUNT_LEVEL_PRO       = 20
         ACCOUNT_LEVEL_EXPERT    = 40
         SCHEDULING_DELAY        = 3
+        # assumed final delivery statuses, DeliveryTracker takes 
+        # final_statuses to override them and max_age to bound polling
+        DELIVERY_FINAL          = ('sent', 'complete', 'failed', 'cancelled')
+        IMPORT_CHUNK_SIZE       = 10000
     
     class CSV_DIALECT:
         NAME                    = 'pure-csv-dialect'
         ESCAPE_CHAR             = '\\'
         QUOTE_CHAR              = '"'
         STRIP_SPACE             = True
-        QUOTING                 = csv.QUOTE_MINIMAL
+        QUOTING                 = 0 # csv.QUOTE_MINIMAL
         
     
     class EXCEPTIONS:
@@ -133,10 +2469,267 @@ class PureResponseClient(object):
         BEAN_NOT_CREATED    = 'ERROR_BEAN_NOT_CREATED'
         COULD_NOT_DELIVER   = 'ERROR_COULD_NOT_DELIVER'
         INVALID_PARAMS      = 'ERROR_INVALID_PARAMETERS'
+        INVALID_CONTACTS    = 'ERROR_INVALID_CONTACTS'
+        CATALOG_NOT_SET     = 'ERROR_CATALOG_NOT_SET'
+        BATCHER_CLOSED      = 'ERROR_BATCHER_CLOSED'
+        CIRCUIT_OPEN        = 'ERROR_CIRCUIT_OPEN'
+        BULKHEAD_FULL       = 'ERROR_BULKHEAD_FULL'
+        TRACKING_EXPIRED    = 'ERROR_TRACKING_EXPIRED'
+        CONTEXT_CHANGED     = 'ERROR_CONTEXT_CHANGED'
+    
+    # encoding plans of _dict_to_ptarr keys, shared by all clients
+    KEY_PLANS = _KeyPlanCache()
+    
+    COALESCED_PROCESSES = (
+        BEAN_PROCESSES.SEARCH
+      , BEAN_PROCESSES.LOAD
+    )
+    
+    # bean class -> (catalog kind, name field, id field)
+    CATALOG_CLASSES = {
+        BEAN_CLASSES.CAMPAIGN_LIST  : (Catalog.LISTS, FIELDS.LIST_NAME, FIELDS.LIST_ID)
+      , BEAN_CLASSES.CAMPAIGN_EMAIL : (Catalog.MESSAGES, FIELDS.MESSAGE_NAME, FIELDS.MESSAGE_ID)
+    }
+    
+    def __init__(self, api_version = API.RPC_LITERAL_UNBRANDED
+        , coalesce_requests = True, profile = False, contact_index = None
+        , catalog = None, message_hashes = None, track_deliveries = False
+        , wire_log = None, isolation = None):
+        """
+        ----------------------------------------------
+        @param api_version          - wsdl location of the API.
+        @param coalesce_requests    - share a single network call between 
+                                      identical concurrent read-only 
+                                      requests (search, load).
+        @param profile              - record a span tree for every public 
+                                      API call, see self.profiler.
+        @param contact_index        - [optional] ContactIndex used to skip 
+                                      contacts already appended to a list 
+                                      with unchanged data.
+        @param catalog              - [optional] Catalog used to look up 
+                                      lists and messages by name, see 
+                                      self.api_refresh_catalog.
+        @param message_hashes       - [optional] dictionary (or anydbm / 
+                                      shelve database) of message name to 
+                                      content hash, used by api_create_email 
+                                      to skip messages stored unchanged.
+        @param track_deliveries     - poll deliveries stored by 
+                                      api_send_to_list until they complete, 
+                                      see self.delivery_tracker.
+        @param wire_log             - [optional] WireLog keeping sanitised 
+                                      envelopes of failed and sampled 
+                                      requests.
+        @param isolation            - [optional] Isolation with circuit 
+                                      breakers and bulkheads per bean 
+                                      class.
+        """
+        self.api_version    = api_version
+        self._client_lock   = threading.Lock()
+        self._auth_lock     = threading.Lock()
+        self._thread_client = threading.local()
+        self._thread_profiler = threading.local()
+        self._pid           = os.getpid()
+        _clients.add(self)
+        if coalesce_requests:
+            self.coalescer  = RequestCoalescer()
+        if profile:
+            self.profiler   = Profiler()
+        self.contact_index  = contact_index
+        self.catalog        = catalog
+        self.message_hashes = message_hashes
+        if track_deliveries:
+            self.delivery_tracker = DeliveryTracker(self)
+        self.wire_log       = wire_log
+        self.isolation      = isolation
+    
+    def api_config(self, credentials = True):
+        """
+        Picklable ClientConfig for this client, see ClientConfig for 
+        the options it carries.
+        ----------------------------------------------
+        @param credentials          - include the credentials of the 
+                                      last successful authentication.
+        """
+        username, password, account_level = (
+            (credentials and self._credentials) or ('', '', None)
+        )
+        return ClientConfig(
+            username
+          , password
+          , account_level
+          , self.api_version
+          , self.coalescer is not None
+          , self._profiler is not None
+          , self.delivery_tracker is not None
+        )
+    
+    def __reduce__(self):
+        # a live client holds sockets, locks and threads, so it is 
+        # pickled as its configuration. The password is left out so 
+        # that pickles, caches and logs of a client never hold it: an 
+        # unpickled client needs api_authenticate, or hand workers an 
+        # explicit api_config() instead.
+        return (_client_from_config, (self.api_config(credentials = False),))
+    
+    def _check_fork(self):
+        """
+        Internal use.
+        Reset per-process state if this client was inherited from 
+        a parent process. Covers interpreters without 
+        os.register_at_fork.
+        """
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+    
+    def _reset_after_fork(self):
+        """
+        Internal use.
+        Drop the transport, context, locks and threads inherited from 
+        the parent process. Requests made in the child authenticate 
+        again, and build their own suds client, on first use.
+        """
+        self._pid               = os.getpid()
+        self._client_lock       = threading.Lock()
+        self._auth_lock         = threading.Lock()
+        self._thread_client     = threading.local()
+        self._thread_profiler   = threading.local()
+        self._api_client        = None
+        self._api_client_thread = None
+        self._flow_pool         = None
+        self.api_context        = None
+        if self.coalescer is not None:
+            self.coalescer      = RequestCoalescer()
+        if self._profiler is not None:
+            self._profiler      = Profiler()
+        if self.isolation is not None:
+            self.isolation.reset()
+        if self.delivery_tracker is not None:
+            self.delivery_tracker._reset_after_fork()
+    
+    def _api_authenticate_lazily(self):
+        """
+        Internal use.
+        Authenticate with the stored credentials when a request is 
+        made without a context, e.g. by a client created from a 
+        ClientConfig or after a fork.
+        """
+        with self._auth_lock:
+            if (self.api_context is None) and (self._credentials is not None):
+                self.api_authenticate(*self._credentials)
+    
+    @property
+    def api_client(self):
+        """
+        The suds client, built on first use since fetching and 
+        parsing the wsdl is by far the most expensive part of 
+        setting up a client.
+        Suds clients are not safe to share between threads, so 
+        any thread other than the one which built the client gets 
+        its own clone, which reuses the parsed wsdl.
+        """
+        if self._api_client is None:
+            with self._client_lock:
+                if self._api_client is None:
+                    self._api_client_thread = threading.current_thread().ident
+                    self._api_client = _unshare_replies(_suds().client.Client(
+                        self.api_version
+                      , plugins = [_paint_plugin(self)]
+                    ))
+        master = self._api_client
+        if self._api_client_thread == threading.current_thread().ident:
+            return master
+        local = self._thread_client
+        if getattr(local, 'master', None) is not master:
+            local.master = master
+            local.client = master.clone()
+        return local.client
+    
+    @api_client.setter
+    def api_client(self, api_client):
+        self._api_client_thread = threading.current_thread().ident
+        self._api_client        = _unshare_replies(api_client)
+    
+    def api_flow(self):
+        """
+        New RequestGraph for composing a custom flow of requests, 
+        recording its steps in self.profiler if profiling. Run it 
+        with graph.run(self.api_flow_pool()).
+        """
+        return RequestGraph(self.profiler, self._profiling)
+    
+    def api_flow_pool(self):
+        """
+        Thread pool shared by the flows of this client, created on 
+        first use with flow_concurrency threads.
+        """
+        if self._flow_pool is None:
+            with self._client_lock:
+                if self._flow_pool is None:
+                    from multiprocessing.pool import ThreadPool
+                    self._flow_pool = ThreadPool(self.flow_concurrency)
+        return self._flow_pool
+    
+    def warmup(self):
+        """
+        Build the suds client up front rather than on the first 
+        request, for callers who would rather pay the cost of 
+        fetching the wsdl at startup.
+        """
+        return self.api_client
+    
+    @contextlib.contextmanager
+    def api_profile(self, profiler = None):
+        """
+        Profile the API calls made within a with block.
+        Yields the profiler in use, which can then be exported 
+        using its to_chrome_trace and summary methods.
+        ----------------------------------------------
+        @param profiler     - [optional] profiler to record into, 
+                              a new one is created by default.
+        """
+        with self._profiling(profiler or Profiler()) as profiler:
+            yield profiler
+    
+    @contextlib.contextmanager
+    def _profiling(self, profiler):
+        """
+        Internal use.
+        Record the API calls made by the current thread in profiler 
+        within a with block, leaving other threads untouched.
+        """
+        previous = getattr(self._thread_profiler, 'profiler', None)
+        self._thread_profiler.profiler = profiler
+        try:
+            yield profiler
+        finally:
+            self._thread_profiler.profiler = previous
     
-    def __init__(self, api_version = API.RPC_LITERAL_UNBRANDED):
-        self.api_client     = SudsPaint(api_version)
+    @property
+    def profiler(self):
+        """
+        Profiler recording API calls made by the current thread: the 
+        one of an enclosing self.api_profile block, otherwise the one 
+        of the client (set with profile = True), if any.
+        """
+        profiler = getattr(self._thread_profiler, 'profiler', None)
+        if profiler is None:
+            return self._profiler
+        return profiler
+    
+    @profiler.setter
+    def profiler(self, profiler):
+        self._profiler = profiler
+    
+    def _span(self, name, **args):
+        """
+        Internal use.
+        Span context for a stage, a shared no-op when not profiling.
+        """
+        if self.profiler is None:
+            return _NULL_SPAN
+        return self.profiler.span(name, **args)
     
+    @_profiled
     def api_authenticate(self, api_username = '', api_password = '', api_account_level = VALUES.ACCOUNT_LEVEL_LITE):
         """
         Authenticate to receive a context key for use in API requests.
@@ -170,12 +2763,18 @@ class PureResponseClient(object):
               , PureResponseClient.BEAN_TYPES.ENTITY
               , PureResponseClient.BEAN_CLASSES.CONTEXT
             )
+            self._credentials = (api_username, api_password, api_account_level)
             return self._dict_ok(self.api_context)
-        elif self._result_exception(auth, PureResponseClient.EXCEPTIONS.VALIDATION):
+        elif self._rejected(auth):
+            return auth
+        
+        self._credentials = None
+        if self._result_exception(auth, PureResponseClient.EXCEPTIONS.VALIDATION):
             return self._dict_err(PureResponseClient.ERRORS.AUTH_PARAMS, auth)
         else:
             return self._dict_err(PureResponseClient.ERRORS.AUTH_PROCESS, auth)
     
+    @_profiled
     def api_invalidate(self):
         self.api_make_request(
             PureResponseClient.BEAN_TYPES.FACADE
@@ -186,7 +2785,9 @@ class PureResponseClient(object):
         self.api_context    = None
         self.api_password   = ''
         self.api_username   = ''
+        self._credentials   = None
     
+    @_profiled
     def api_send_to_list(self, list_name, message_name, scheduling_delay = {
         VALUES.SCHEDULING_UNIT : VALUES.SCHEDULING_DELAY}):
         """
@@ -198,156 +2799,52 @@ class PureResponseClient(object):
                                   should wait before sending the campaign, 
                                   defaults to 3 minutes.
         """
-        create = self.api_make_request(
-            PureResponseClient.BEAN_TYPES.FACADE
-          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
-          , PureResponseClient.BEAN_PROCESSES.CREATE
-        )
-        if self._result_success(create):
-            delivery_input = {
-                PureResponseClient.FIELDS.BEAN_ID : self._get_bean_id(
-                    create
-                  , PureResponseClient.BEAN_TYPES.ENTITY
-                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
-                )
-            }
-            search_response = self.api_make_request(
+        graph = self.api_flow()
+        graph.add(
+            'create'
+          , lambda results: self.api_make_request(
                 PureResponseClient.BEAN_TYPES.FACADE
-              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
-              , PureResponseClient.BEAN_PROCESSES.SEARCH
-              , {PureResponseClient.FIELDS.LIST_NAME : list_name}
+              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
+              , PureResponseClient.BEAN_PROCESSES.CREATE
             )
-            if self._result_success(search_response):
-                found = self._get_found_data(
-                    search_response
-                  , PureResponseClient.BEAN_TYPES.SEARCH
-                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
-                )
-                if len(found) is not 0:
-                    loaded = False
-                    for key in found:
-                        entity_data = found[key]
-                        load_response = self.api_make_request(
-                            PureResponseClient.BEAN_TYPES.FACADE
-                          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
-                          , PureResponseClient.BEAN_PROCESSES.LOAD
-                          , entity_data
-                        )
-                        
-                        if not self._result_success(load_response):
-                            continue
-                        
-                        load_output = self._response_data(
-                            load_response
-                          , PureResponseClient.BEAN_TYPES.ENTITY
-                          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
-                        )
-                        
-                        loaded_name = load_output.get(
-                            PureResponseClient.FIELDS.LIST_NAME
-                        )
-                        
-                        if (unicode(loaded_name) == unicode(list_name)):
-                            delivery_input[PureResponseClient.FIELDS.LIST_IDS] = {
-                                PureResponseClient.FIELDS.FIRST_INDEX : found[
-                                    PureResponseClient.FIELDS.FIRST_INDEX
-                                ].get(PureResponseClient.FIELDS.LIST_ID)
-                            }
-                            loaded = True
-                    if loaded is False:
-                        return self._dict_err(
-                            PureResponseClient.ERRORS.LIST_NOT_FOUND
-                          , self._response_data(search_response)
-                        )
-                else:
-                    return self._dict_err(
-                        PureResponseClient.ERRORS.LIST_NOT_FOUND
-                      , self._response_data(search_response)
-                    )
-            else:
-                return self._dict_err(
-                    PureResponseClient.ERRORS.GENERIC
-                  , self._response_data(search_response)
-                )
-            
-            search_response = self.api_make_request(
-                PureResponseClient.BEAN_TYPES.FACADE
-              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-              , PureResponseClient.BEAN_PROCESSES.SEARCH
-              , {PureResponseClient.FIELDS.MESSAGE_NAME : message_name}
+          , failed = lambda response: not self._result_success(response)
+        )
+        graph.add(
+            'list'
+          , lambda results: self._api_find(
+                PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+              , list_name
+              , PureResponseClient.ERRORS.LIST_NOT_FOUND
             )
-            
-            if self._result_success(search_response):
-                found = self._get_found_data(
-                    search_response
-                  , PureResponseClient.BEAN_TYPES.SEARCH
-                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-                )
-                if len(found) is not 0:
-                    loaded = False
-                    for key in found:
-                        entity_data = found[key]
-                        load_response = self.api_make_request(
-                            PureResponseClient.BEAN_TYPES.FACADE
-                          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-                          , PureResponseClient.BEAN_PROCESSES.LOAD
-                          , entity_data
-                        )
-                        
-                        if not self._result_success(load_response):
-                            continue
-                        
-                        load_output = self._response_data(
-                            load_response
-                          , PureResponseClient.BEAN_TYPES.ENTITY
-                          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-                        )
-                        
-                        loaded_name = load_output.get(
-                            PureResponseClient.FIELDS.MESSAGE_NAME
-                        )
-                        
-                        if (unicode(loaded_name) == unicode(message_name)):
-                            delivery_input[
-                                PureResponseClient.FIELDS.MESSAGE_ID
-                            ] = found[
-                                PureResponseClient.FIELDS.FIRST_INDEX
-                            ].get(PureResponseClient.FIELDS.MESSAGE_ID)
-                            loaded = True
-                    if loaded is False:
-                        return self._dict_err(
-                            PureResponseClient.ERRORS.MESSAGE_NOT_FOUND
-                          , self._response_data(search_response)
-                        )
-                else:
-                    return self._dict_err(
-                        PureResponseClient.ERRORS.MESSAGE_NOT_FOUND
-                      , self._response_data(search_response)
-                    )
-            else:
-                return self._dict_err(
-                    PureResponseClient.ERRORS.GENERIC
-                  , self._response_data(search_response)
-                )
-            schedule_time = datetime.datetime.now() + datetime.timedelta(**scheduling_delay)
-            schedule_time = schedule_time.strftime('%d/%m/%Y %H:%M')
-            delivery_input[PureResponseClient.FIELDS.DELIVERY_TIME] = schedule_time
-            
-            response = self.api_make_request(
-                PureResponseClient.BEAN_TYPES.FACADE
-              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
-              , PureResponseClient.BEAN_PROCESSES.STORE
-              , delivery_input
+        )
+        graph.add(
+            'message'
+          , lambda results: self._api_find(
+                PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+              , message_name
+              , PureResponseClient.ERRORS.MESSAGE_NOT_FOUND
             )
-            
-            if self._result_success(response):
-                return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
-            else:
-                return self._dict_err(
-                    PureResponseClient.ERRORS.COULD_NOT_DELIVER
-                  , self._response_data(response)
-                )
-        elif self._get_result(create) is PureResponseClient.ERRORS.NOT_AUTHENTICATED:
+        )
+        graph.add(
+            'store'
+          , lambda results: self._api_store_delivery(
+                results['create']
+              , results['list']
+              , results['message']
+              , scheduling_delay
+            )
+          , depends = ('create', 'list', 'message')
+        )
+        results = graph.run(self.api_flow_pool())
+        
+        failed = graph.failed()
+        if failed is None:
+            return results['store']
+        elif failed != 'create':
+            return results[failed]
+        
+        create = results['create']
+        if self._rejected(create):
             return create
         else:
             return self._dict_err(
@@ -355,6 +2852,72 @@ class PureResponseClient(object):
               , self._response_data(create)
             )
     
+    def _api_store_delivery(self, create, list_response, message_response
+        , scheduling_delay):
+        """
+        Internal use.
+        Final step of self.api_send_to_list, storing the delivery 
+        once the delivery bean has been created and the list and 
+        message have been found.
+        ----------------------------------------------
+        @param create           - delivery CREATE response.
+        @param list_response    - outcome of finding the list.
+        @param message_response - outcome of finding the message.
+        @param scheduling_delay - see self.api_send_to_list.
+        """
+        delivery_input = {
+            PureResponseClient.FIELDS.BEAN_ID : self._get_bean_id(
+                create
+              , PureResponseClient.BEAN_TYPES.ENTITY
+              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
+            )
+          , PureResponseClient.FIELDS.LIST_IDS : {
+                PureResponseClient.FIELDS.FIRST_INDEX : list_response['result'].get(
+                    PureResponseClient.FIELDS.LIST_ID
+                )
+            }
+          , PureResponseClient.FIELDS.MESSAGE_ID : message_response['result'].get(
+                PureResponseClient.FIELDS.MESSAGE_ID
+            )
+        }
+        schedule_time = datetime.datetime.now() + datetime.timedelta(**scheduling_delay)
+        schedule_time = schedule_time.strftime('%d/%m/%Y %H:%M')
+        delivery_input[PureResponseClient.FIELDS.DELIVERY_TIME] = schedule_time
+        
+        response = self.api_make_request(
+            PureResponseClient.BEAN_TYPES.FACADE
+          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
+          , PureResponseClient.BEAN_PROCESSES.STORE
+          , delivery_input
+        )
+        
+        if self._result_success(response):
+            if self.delivery_tracker is not None:
+                bean_id = delivery_input[PureResponseClient.FIELDS.BEAN_ID]
+                # the stored entity may not be echoed back
+                stored  = (response.get(PureResponseClient.FIELDS.RESULT_DATA) or {}).get(
+                    PureResponseClient.BEAN_TYPES.ENTITY
+                  + '_'
+                  + PureResponseClient.BEAN_CLASSES.CAMPAIGN_DELIVERY
+                ) or {}
+                delivery_id = stored.get(PureResponseClient.FIELDS.DELIVERY_ID)
+                return self._dict_ok(PureResponseClient.VALUES.SUCCESS, {
+                    PureResponseClient.FIELDS.BEAN_ID   : bean_id
+                  , 'delivery'                          : self.delivery_tracker.track(
+                        bean_id
+                      , delivery_id = delivery_id
+                    )
+                })
+            return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
+        elif self._rejected(response):
+            return response
+        else:
+            return self._dict_err(
+                PureResponseClient.ERRORS.COULD_NOT_DELIVER
+              , self._response_data(response)
+            )
+    
+    @_profiled
     def api_send_to_contact(self, email_to, message_name, custom_data = None):
         """
         Send one to one email message.
@@ -397,12 +2960,14 @@ class PureResponseClient(object):
             
             if self._result_success(response):
                 return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
+            elif self._rejected(response):
+                return response
             else:
                 return self._dict_err(
                     PureResponseClient.ERRORS.COULD_NOT_DELIVER
                   , self._response_data(response)
                 )
-        elif self._get_result(create) is PureResponseClient.ERRORS.NOT_AUTHENTICATED:
+        elif self._rejected(create):
             return create
         else:
             response_data = self._response_data(create)
@@ -415,6 +2980,7 @@ class PureResponseClient(object):
                 PureResponseClient.ERRORS.GENERIC
               , response_data
             )
+    @_profiled
     def api_create_email(self, message_name, subject, message_body):
         """
         Create a new email message for one-to-one or bulk 
@@ -422,87 +2988,111 @@ class PureResponseClient(object):
         ----------------------------------------------
         @param message_name     - Unique message name.
         @param subject          - Desired subject line.
-        @param message_body     - Message content, html enabled.
+        @param message_body     - Message content, html enabled. Either 
+                                  a string or a MessageBody, which is 
+                                  encoded as it is read.
+        
+        Without self.message_hashes an existing message of the same 
+        name is an ERROR_MESSAGE_NAME_EXISTS error. With it, an 
+        existing message is left alone when the hash of its subject 
+        and body matches the one recorded at its last store, the 
+        result being successful with 'unchanged' set in 'meta', and 
+        is stored with the new subject and body otherwise.
         """
-        search_response = self.api_make_request(
-            PureResponseClient.BEAN_TYPES.FACADE
-          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-          , PureResponseClient.BEAN_PROCESSES.SEARCH
-          , {PureResponseClient.FIELDS.MESSAGE_NAME : message_name}
+        import hashlib
+        if not isinstance(message_body, MessageBody):
+            message_body = MessageBody.from_string(message_body)
+        content_hash = None
+        if self.message_hashes is not None:
+            with self._span('hash_body'):
+                content_hash = hashlib.sha1('\x00'.join([
+                    self._encode_utf8(subject)
+                  , message_body.digest()
+                ])).hexdigest()
+        
+        existing = self._api_find(
+            PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+          , message_name
+          , PureResponseClient.ERRORS.MESSAGE_NOT_FOUND
         )
-        if self._result_success(search_response):
-            found = self._get_found_data(
-                search_response
-              , PureResponseClient.BEAN_TYPES.SEARCH
-              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-            )
-            
-            for key in found:
-                entity_data = found[key]
-                load_response = self.api_make_request(
-                    PureResponseClient.BEAN_TYPES.FACADE
-                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-                  , PureResponseClient.BEAN_PROCESSES.LOAD
-                  , entity_data
+        if existing['ok']:
+            if content_hash is None:
+                return self._dict_err(
+                    PureResponseClient.ERRORS.MESSAGE_NAME_EXISTS
                 )
-                
-                if not self._result_success(load_response):
-                    continue
-                
-                load_output = self._response_data(
-                    load_response
-                  , PureResponseClient.BEAN_TYPES.ENTITY
-                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+            if self.message_hashes.get(self._encode_utf8(message_name)) == content_hash:
+                return self._dict_ok(
+                    PureResponseClient.VALUES.SUCCESS
+                  , {'unchanged' : True}
                 )
-                
-                loaded_name = load_output.get(
-                    PureResponseClient.FIELDS.MESSAGE_NAME
+            loaded = self._api_load_found(
+                PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+              , existing['result']
+            )
+            if (loaded is None) or not loaded.get(PureResponseClient.FIELDS.BEAN_ID):
+                return self._dict_err(
+                    PureResponseClient.ERRORS.MESSAGE_NOT_FOUND
                 )
-                if (unicode(loaded_name) == unicode(message_name)):
-                    return self._dict_err(
-                        PureResponseClient.ERRORS.MESSAGE_NAME_EXISTS
-                    )
-            
+            bean_id = loaded[PureResponseClient.FIELDS.BEAN_ID]
+        elif existing['result'] != PureResponseClient.ERRORS.MESSAGE_NOT_FOUND:
+            return existing
+        else:
             create_response = self.api_make_request(
                 PureResponseClient.BEAN_TYPES.FACADE
               , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
               , PureResponseClient.BEAN_PROCESSES.CREATE
             )
-            
-            if self._result_success(create_response):
-                entity_data = {
-                    PureResponseClient.FIELDS.MESSAGE_NAME  : message_name
-                  , PureResponseClient.FIELDS.SUBJECT       : subject
-                  , PureResponseClient.FIELDS.BODY_HTML     : message_body
-                  , PureResponseClient.FIELDS.BEAN_ID       : self._get_bean_id(
-                        create_response
-                      , PureResponseClient.BEAN_TYPES.ENTITY
-                      , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-                  )
-                }
-                
-                response = self.api_make_request(
-                    PureResponseClient.BEAN_TYPES.FACADE
-                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
-                  , PureResponseClient.BEAN_PROCESSES.STORE
-                  , entity_data
-                )
-                
-                if self._result_success(response):
-                    return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
-                else:
-                    return self._dict_err(
-                        PureResponseClient.ERRORS.MESSAGE_NOT_SAVED
-                      , self._response_data(response)
-                    )
-            else:
+            if self._rejected(create_response):
+                return create_response
+            elif not self._result_success(create_response):
                 return self._dict_err(
                     PureResponseClient.ERRORS.BEAN_NOT_CREATED
                   , self._response_data(create_response)
                 )
+            bean_id = self._get_bean_id(
+                create_response
+              , PureResponseClient.BEAN_TYPES.ENTITY
+              , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+            )
+        
+        entity_data = {
+            PureResponseClient.FIELDS.MESSAGE_NAME  : message_name
+          , PureResponseClient.FIELDS.SUBJECT       : subject
+          , PureResponseClient.FIELDS.BEAN_ID       : bean_id
+        }
+        with self._span('encode_body'):
+            entity_data[
+                PureResponseClient.FIELDS.BODY_HTML
+              + PureResponseClient.FIELDS.BASE64_PARTIAL
+            ] = message_body.encode()
+        
+        response = self.api_make_request(
+            PureResponseClient.BEAN_TYPES.FACADE
+          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+          , PureResponseClient.BEAN_PROCESSES.STORE
+          , entity_data
+        )
+        
+        if self._result_success(response):
+            self._catalog_put(
+                PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+              , message_name
+            )
+            if content_hash is not None:
+                self.message_hashes[self._encode_utf8(message_name)] = content_hash
+            return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
+        elif self._rejected(response):
+            return response
+        else:
+            return self._dict_err(
+                PureResponseClient.ERRORS.MESSAGE_NOT_SAVED
+              , self._response_data(response)
+            )
     
+    @_profiled
     def api_create_contact_list(self, list_name, list_data
-        , notify_uri = None, overwrite_existing = False):
+        , notify_uri = None, overwrite_existing = False, validate = False
+        , checkpoint_dir = None, chunk_size = None):
         """
         Create a new contact list.
         Uses internal helpers to achieve this in accordance 
@@ -518,7 +3108,44 @@ class PureResponseClient(object):
         @param overwrite_existing   - Boolean describing the action to 
                                       be taken if a list by the given name 
                                       already exists.
+        @param validate             - validate and normalise list_data 
+                                      before uploading, see 
+                                      self.api_validate_contacts. Rejected 
+                                      contacts are returned in 'meta'.
+        @param checkpoint_dir       - [optional] directory for a checkpoint 
+                                      file, making the upload resumable, 
+                                      see self._api_import_resumable.
+        @param chunk_size           - contacts per chunk of a resumable 
+                                      upload.
         """
+        if checkpoint_dir is not None:
+            return self._api_import_resumable(
+                list_name
+              , list_data
+              , notify_uri
+              , validate
+              , checkpoint_dir
+              , chunk_size
+              , create              = True
+              , overwrite_existing  = overwrite_existing
+            )
+        meta = None
+        if validate:
+            validation = self.api_validate_contacts(list_data)
+            if not validation['ok']:
+                return validation
+            meta        = validation['result']
+            list_data   = meta.pop('contacts')
+        
+        entry = self._catalog_lookup(
+            PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+          , list_name
+        )
+        if (entry is not None) and not overwrite_existing:
+            return self._dict_err(
+                PureResponseClient.ERRORS.LIST_NAME_EXISTS
+            )
+        
         search_response = self.api_make_request(
             PureResponseClient.BEAN_TYPES.FACADE
           , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
@@ -532,11 +3159,17 @@ class PureResponseClient(object):
               , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
             )
             if len(found) is 0:
-                return self._api_new_contact_list_helper(list_name, list_data, notify_uri)
+                return self._with_meta(
+                    self._api_new_contact_list_helper(list_name, list_data, notify_uri)
+                  , meta
+                )
             elif overwrite_existing:
                 remove_response = self._api_remove_contact_list_helper(list_name, found)
                 if self._result_success(remove_response):
-                    return self._api_new_contact_list_helper(list_name, list_data, notify_uri)
+                    return self._with_meta(
+                        self._api_new_contact_list_helper(list_name, list_data, notify_uri)
+                      , meta
+                    )
                 else:
                     return remove_response
             else:
@@ -544,7 +3177,7 @@ class PureResponseClient(object):
                     PureResponseClient.ERRORS.LIST_NAME_EXISTS
                   , self._response_data(search_response)
                 )
-        elif self._get_result(search_response) is PureResponseClient.ERRORS.NOT_AUTHENTICATED:
+        elif self._rejected(search_response):
             return search_response
         else:
             return self._dict_err(
@@ -552,6 +3185,214 @@ class PureResponseClient(object):
               , self._response_data(search_response)
             )
     
+    def _api_find(self, bean_class, name, not_found_error):
+        """
+        Internal use.
+        Find a list or message by its exact name. Answered from 
+        self.catalog when it holds the name with its id, otherwise 
+        SEARCH by name and LOAD each (partial) match to compare names.
+        On success the result is the entry of the match, holding 
+        its listId or messageId.
+        ----------------------------------------------
+        @param bean_class       - campaign_list or campaign_email.
+        @param name             - name of the list or message.
+        @param not_found_error  - error to return if there is no match.
+        """
+        kind, name_field, id_field = PureResponseClient.CATALOG_CLASSES[bean_class]
+        entry = self._catalog_lookup(bean_class, name)
+        if (entry is not None) and entry.get(id_field):
+            return self._dict_ok(entry)
+        
+        search_response = self.api_make_request(
+            PureResponseClient.BEAN_TYPES.FACADE
+          , bean_class
+          , PureResponseClient.BEAN_PROCESSES.SEARCH
+          , {name_field : name}
+        )
+        if self._rejected(search_response):
+            return search_response
+        elif not self._result_success(search_response):
+            return self._dict_err(
+                PureResponseClient.ERRORS.GENERIC
+              , self._response_data(search_response)
+            )
+        found = self._get_found_data(
+            search_response
+          , PureResponseClient.BEAN_TYPES.SEARCH
+          , bean_class
+        )
+        for key in found:
+            load_output = self._api_load_found(bean_class, found[key])
+            if load_output is None:
+                continue
+            if (unicode(load_output.get(name_field)) == unicode(name)):
+                return self._dict_ok(found[key])
+        return self._dict_err(
+            not_found_error
+          , self._response_data(search_response)
+        )
+    
+    def _api_load_found(self, bean_class, found_entry):
+        """
+        Internal use.
+        LOAD a bean found by a SEARCH, None if it could not be loaded.
+        ----------------------------------------------
+        @param bean_class       - class of the found bean.
+        @param found_entry      - entry of the search's found data.
+        """
+        load_response = self.api_make_request(
+            PureResponseClient.BEAN_TYPES.FACADE
+          , bean_class
+          , PureResponseClient.BEAN_PROCESSES.LOAD
+          , found_entry
+        )
+        if not self._result_success(load_response):
+            return None
+        return self._response_data(
+            load_response
+          , PureResponseClient.BEAN_TYPES.ENTITY
+          , bean_class
+        )
+    
+    @_profiled
+    def api_refresh_catalog(self, concurrency = 8):
+        """
+        Enumerate all lists and messages on the account into 
+        self.catalog, loading them concurrently.
+        Relies on a SEARCH by empty name matching every bean, in 
+        the same way a SEARCH by name matches any bean whose name 
+        contains it.
+        ----------------------------------------------
+        @param concurrency      - number of requests to make at once.
+        """
+        from multiprocessing.pool import ThreadPool
+        if self.catalog is None:
+            return self._dict_err(PureResponseClient.ERRORS.CATALOG_NOT_SET)
+        bean_classes = [
+            PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL
+        ]
+        
+        def search(bean_class):
+            return self.api_make_request(
+                PureResponseClient.BEAN_TYPES.FACADE
+              , bean_class
+              , PureResponseClient.BEAN_PROCESSES.SEARCH
+              , {PureResponseClient.CATALOG_CLASSES[bean_class][1] : u''}
+            )
+        
+        def load(item):
+            return self._api_load_found(*item)
+        
+        pool = ThreadPool(concurrency)
+        try:
+            searches = pool.map(search, bean_classes)
+            items = []
+            for bean_class, search_response in zip(bean_classes, searches):
+                if self._rejected(search_response):
+                    return search_response
+                elif not self._result_success(search_response):
+                    return self._dict_err(
+                        PureResponseClient.ERRORS.GENERIC
+                      , self._response_data(search_response)
+                    )
+                found = self._get_found_data(
+                    search_response
+                  , PureResponseClient.BEAN_TYPES.SEARCH
+                  , bean_class
+                )
+                items.extend((bean_class, found[key]) for key in found)
+            loaded = pool.map(load, items)
+        finally:
+            pool.close()
+        
+        entries = dict((bean_class, {}) for bean_class in bean_classes)
+        for (bean_class, found_entry), load_output in zip(items, loaded):
+            if load_output is None:
+                continue
+            entry = dict(load_output)
+            entry.update(found_entry)
+            # bean ids only identify a bean within a context
+            entry.pop(PureResponseClient.FIELDS.BEAN_ID, None)
+            name_field = PureResponseClient.CATALOG_CLASSES[bean_class][1]
+            entries[bean_class][unicode(entry.get(name_field))] = entry
+        self.catalog.replace(
+            entries[PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST]
+          , entries[PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL]
+          , self._catalog_account()
+        )
+        return self._dict_ok({
+            Catalog.LISTS       : len(entries[PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST])
+          , Catalog.MESSAGES    : len(entries[PureResponseClient.BEAN_CLASSES.CAMPAIGN_EMAIL])
+        })
+    
+    def _api_refresh_catalog_background(self):
+        """
+        Internal use.
+        Refresh self.catalog on a background thread unless a 
+        refresh is already under way.
+        """
+        catalog = self.catalog
+        with self._client_lock:
+            if catalog.refreshing:
+                return
+            catalog.refreshing = True
+        
+        def refresh():
+            refreshed = False
+            try:
+                refreshed = self.api_refresh_catalog()['ok']
+            finally:
+                if not refreshed:
+                    catalog.refresh_failed()
+                catalog.refreshing = False
+        
+        thread = threading.Thread(target = refresh)
+        thread.daemon = True
+        thread.start()
+    
+    def _catalog_lookup(self, bean_class, name):
+        """
+        Internal use.
+        Look a name up in self.catalog. Returns its entry, or None 
+        when the catalog cannot answer or does not hold the name, in 
+        which case the caller has to SEARCH: the name may have been 
+        created after the last refresh, e.g. by another process.
+        ----------------------------------------------
+        @param bean_class       - campaign_list or campaign_email.
+        @param name             - name of the list or message.
+        """
+        catalog = self.catalog
+        if (catalog is None) or (self.api_context is None):
+            return None
+        account = self._catalog_account()
+        if catalog.needs_refresh(account):
+            self._api_refresh_catalog_background()
+        if not catalog.is_usable(account):
+            return None
+        return catalog.get(PureResponseClient.CATALOG_CLASSES[bean_class][0], name)
+    
+    def _catalog_account(self):
+        """
+        Internal use.
+        Account self.catalog entries belong to, the username.
+        """
+        if self.api_username is None:
+            return None
+        return self.api_username.decode('utf-8')
+    
+    def _catalog_put(self, bean_class, name):
+        """
+        Internal use.
+        Record a newly stored list or message in self.catalog. Its 
+        id is only known after the next refresh, until then lookups 
+        by id fall back to a SEARCH.
+        """
+        catalog = self.catalog
+        if (catalog is not None) and (catalog.account == self._catalog_account()):
+            kind, name_field, id_field = PureResponseClient.CATALOG_CLASSES[bean_class]
+            catalog.put(kind, name, {name_field : name})
+    
     def _api_new_contact_list_helper(self, list_name, list_data, notify_uri):
         """
         Internal use.
@@ -582,18 +3423,21 @@ class PureResponseClient(object):
                 )
             }
             
-            paste_file = self._dictlist_to_csv(list_data)
-            entity_data[
-                PureResponseClient.FIELDS.PASTE_FILE
-              + PureResponseClient.FIELDS.BASE64_PARTIAL
-            ] = base64.b64encode(paste_file)
+            with self._span('_dictlist_to_csv'):
+                paste_file = self._dictlist_to_csv(list_data)
+            with self._span('base64'):
+                entity_data[
+                    PureResponseClient.FIELDS.PASTE_FILE
+                  + PureResponseClient.FIELDS.BASE64_PARTIAL
+                ] = _base64().b64encode(paste_file)
             
-            entity_data = dict(
-                entity_data
-              , **self._build_contact_entity(
-                    paste_file
+            with self._span('_build_contact_entity'):
+                entity_data = dict(
+                    entity_data
+                  , **self._build_contact_entity(
+                        paste_file
+                    )
                 )
-            )
             response = self.api_make_request(
                 PureResponseClient.BEAN_TYPES.FACADE
               , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
@@ -601,15 +3445,23 @@ class PureResponseClient(object):
               , entity_data
             )
             if self._result_success(response):
+                self._catalog_put(
+                    PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+                  , list_name
+                )
                 return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
+            elif self._rejected(response):
+                return response
             else:
                 return self._dict_err(
                     PureResponseClient.ERRORS.LIST_NOT_SAVED
                   , self._response_data(response)
                 )
+        elif self._rejected(create):
+            return create
         return self._dict_err(
             PureResponseClient.ERRORS.BEAN_NOT_CREATED
-          , self._response_data(search_response)
+          , self._response_data(create)
         )
     
     def _api_remove_contact_list_helper(self, list_name, found):
@@ -634,7 +3486,9 @@ class PureResponseClient(object):
               , entity_data
             )
             
-            if not self._result_success(load_response):
+            if self._rejected(load_response):
+                return load_response
+            elif not self._result_success(load_response):
                 continue
             
             load_output = self._response_data(
@@ -696,12 +3550,14 @@ class PureResponseClient(object):
             
             if self._result_success(response):
                 return self._dict_ok(PureResponseClient.VALUES.SUCCESS)
+            elif self._rejected(response):
+                return response
             else:
                 return self._dict_err(
                     PureResponseClient.ERRORS.LIST_NOT_SAVED
                   , self._response_data(response)
                 )
-        elif self._get_result(create) is PureResponseClient.ERRORS.NOT_AUTHENTICATED:
+        elif self._rejected(create):
             return create
         else:
             return self._dict_err(
@@ -709,7 +3565,8 @@ class PureResponseClient(object):
               , self._response_data(create)
             )
     
-    def _api_add_contact_ambiguous(self, list_name, contact_data, notify_uri):
+    def _api_add_contact_ambiguous(self, list_name, contact_data, notify_uri
+        , validate = False):
         """
         Internal use.
         Abstraction layer between publically exposed functions 
@@ -717,6 +3574,48 @@ class PureResponseClient(object):
         handling (self._api_append_contact_list).
         ----------------------------------------------
         @param list_name        - name of contact list to append to.
+        @param contact_data     - dictionary or list of dictionaries 
+                                  containing contact data to append.
+        @param validate         - validate and normalise contact_data 
+                                  before uploading.
+        """
+        meta = None
+        if validate:
+            if not isinstance(contact_data, list):
+                contact_data = [contact_data]
+            validation = self.api_validate_contacts(contact_data)
+            if not validation['ok']:
+                return validation
+            meta            = validation['result']
+            contact_data    = meta.pop('contacts')
+        
+        if self.contact_index is not None:
+            if not isinstance(contact_data, list):
+                contact_data = [contact_data]
+            contact_data, duplicates = self._api_skip_known_contacts(list_name, contact_data)
+            meta = dict(meta or {}, duplicates = duplicates)
+            if not contact_data:
+                return self._dict_ok(PureResponseClient.VALUES.SUCCESS, meta)
+        
+        response = None
+        try:
+            response = self._api_append_contacts(list_name, contact_data, notify_uri)
+        finally:
+            if self.contact_index is not None:
+                uploaded = (response is not None) and self._result_success(response)
+                for contact in contact_data:
+                    if uploaded:
+                        self.contact_index.add(list_name, contact)
+                    else:
+                        self.contact_index.release(list_name, contact)
+        return self._with_meta(response, meta)
+    
+    def _api_append_contacts(self, list_name, contact_data, notify_uri):
+        """
+        Internal use.
+        Build the paste file for contact_data and APPEND it to the list.
+        ----------------------------------------------
+        @param list_name        - name of contact list to append to.
         @param contact_data     - dictionary or list of dictionaries 
                                   containing contact data to append.
         """
@@ -724,32 +3623,58 @@ class PureResponseClient(object):
             PureResponseClient.FIELDS.LIST_NAME     : list_name
           , PureResponseClient.FIELDS.UPLOAD_TYPE   : PureResponseClient.VALUES.APPEND
         }
-        if isinstance(contact_data, list):
-            paste_file = self._dictlist_to_csv(contact_data)
-        else:
-            paste_file = self._dict_to_csv(contact_data)
+        with self._span('_dictlist_to_csv'):
+            if isinstance(contact_data, list):
+                paste_file = self._dictlist_to_csv(contact_data)
+            else:
+                paste_file = self._dict_to_csv(contact_data)
 		
-        entity_data[
-            PureResponseClient.FIELDS.PASTE_FILE
-          + PureResponseClient.FIELDS.BASE64_PARTIAL
-        ] = base64.b64encode(paste_file)
-        entity_data = dict(
-            entity_data
-          , **self._build_contact_entity(paste_file)
-        )
+        with self._span('base64'):
+            entity_data[
+                PureResponseClient.FIELDS.PASTE_FILE
+              + PureResponseClient.FIELDS.BASE64_PARTIAL
+            ] = _base64().b64encode(paste_file)
+        with self._span('_build_contact_entity'):
+            entity_data = dict(
+                entity_data
+              , **self._build_contact_entity(paste_file)
+            )
         return self._api_append_contact_list(entity_data, notify_uri)
+    
+    def _api_skip_known_contacts(self, list_name, contacts):
+        """
+        Internal use.
+        Drop contacts which self.contact_index has seen on the list 
+        with the same data, or which another upload, or an earlier 
+        repeat within contacts, is already sending, reserving the 
+        others. Returns the remaining contacts and the number dropped.
+        ----------------------------------------------
+        @param list_name        - name of contact list to append to.
+        @param contacts         - list of dictionaries of contact data.
+        """
+        remaining = [
+            contact for contact in contacts
+            if self.contact_index.reserve(list_name, contact)
+        ]
+        return remaining, len(contacts) - len(remaining)
         
-    def api_add_contact(self, list_name, contact, notify_uri = None):
+    @_profiled
+    def api_add_contact(self, list_name, contact, notify_uri = None
+        , validate = False):
         """
         Add single contact to a given contact list.
         Alias for _api_add_contact_ambiguous.
         ----------------------------------------------
         @param list_name        - name of contact list to append to
         @param contact          - dictionary of contact data
+        @param validate         - validate and normalise the contact 
+                                  before uploading.
         """
-        return self._api_add_contact_ambiguous(list_name, contact, notify_uri)
+        return self._api_add_contact_ambiguous(list_name, contact, notify_uri, validate)
     
-    def api_add_contacts(self, list_name, contacts, notify_uri = None):
+    @_profiled
+    def api_add_contacts(self, list_name, contacts, notify_uri = None
+        , validate = False, checkpoint_dir = None, chunk_size = None):
         """
         Add multiple contacts to a given contact list.
         Alias for _api_add_contact_ambiguous.
@@ -760,29 +3685,369 @@ class PureResponseClient(object):
         ----------------------------------------------
         @param list_name        - name of contact list to append to
         @param contacts         - list of dictionaries
+        @param validate         - validate and normalise contacts before 
+                                  uploading, see self.api_validate_contacts. 
+                                  Rejected contacts are returned in 'meta'.
+        @param checkpoint_dir   - [optional] directory for a checkpoint 
+                                  file, making the upload resumable, 
+                                  see self._api_import_resumable.
+        @param chunk_size       - contacts per chunk of a resumable upload.
         """
-        return self._api_add_contact_ambiguous(list_name, contacts, notify_uri)
+        if checkpoint_dir is not None:
+            return self._api_import_resumable(
+                list_name
+              , contacts
+              , notify_uri
+              , validate
+              , checkpoint_dir
+              , chunk_size
+            )
+        return self._api_add_contact_ambiguous(list_name, contacts, notify_uri, validate)
+    
+    def _api_import_resumable(self, list_name, contacts, notify_uri, validate
+        , checkpoint_dir, chunk_size = None, create = False
+        , overwrite_existing = False):
+        """
+        Internal use.
+        Upload contacts in numbered chunks of chunk_size, recording 
+        each chunk the server acknowledges in an ImportCheckpoint. 
+        When creating a list the first chunk creates it, carrying 
+        every field of contacts, and the others are appended. 
+        Calling again with the same list name and contacts after 
+        a failure skips the acknowledged chunks. Chunks without 
+        valid contacts are skipped, their contacts are rejected. 
+        The first chunk is validated before it is padded with every 
+        field, so the padded row is never the one rejected. Empty 
+        contacts are uploaded without chunking.
+        On success 'meta' holds the number of 'chunks', the chunk 
+        the upload 'resumed_at' and, for the chunks uploaded by 
+        this call, 'rejected' contacts and 'duplicates'. On failure 
+        it holds the 'chunk' that failed and its 'response'.
+        ----------------------------------------------
+        @param list_name            - name of the contact list.
+        @param contacts             - list of dictionaries.
+        @param notify_uri           - see self.api_create_contact_list.
+        @param validate             - validate each chunk before 
+                                      uploading it.
+        @param checkpoint_dir       - directory for the checkpoint file.
+        @param chunk_size           - contacts per chunk.
+        @param create               - create the list with the first chunk.
+        @param overwrite_existing   - see self.api_create_contact_list.
+        """
+        if not contacts:
+            # nothing to chunk, let the plain upload handle it
+            if create:
+                return self.api_create_contact_list(
+                    list_name
+                  , contacts
+                  , notify_uri
+                  , overwrite_existing
+                  , validate
+                )
+            return self._api_add_contact_ambiguous(list_name, contacts, notify_uri, validate)
+        chunk_size  = chunk_size or PureResponseClient.VALUES.IMPORT_CHUNK_SIZE
+        checkpoint  = ImportCheckpoint(checkpoint_dir, list_name, contacts, chunk_size)
+        meta        = {
+            'chunks'        : checkpoint.chunks
+          , 'resumed_at'    : checkpoint.acknowledged
+          , 'rejected'      : []
+          , 'duplicates'    : 0
+        }
+        for chunk in xrange(checkpoint.acknowledged, checkpoint.chunks):
+            start       = chunk * chunk_size
+            chunk_data  = contacts[start:start + chunk_size]
+            creating    = create and (chunk == 0)
+            if creating:
+                # validate before padding, so that the row carrying 
+                # every field is one which is uploaded
+                validation_meta = None
+                if validate:
+                    validation = self.api_validate_contacts(chunk_data)
+                    if not validation['ok']:
+                        return self._dict_err(
+                            validation['result']
+                          , dict(meta, chunk = chunk, response = validation)
+                        )
+                    validation_meta = validation['result']
+                    chunk_data      = validation_meta.pop('contacts')
+                fields = set()
+                for contact in contacts:
+                    fields.update(contact)
+                first = dict.fromkeys(fields, PureResponseClient.VALUES.EMPTY_STRING)
+                first.update(chunk_data[0])
+                response = self._with_meta(
+                    self.api_create_contact_list(
+                        list_name
+                      , [first] + chunk_data[1:]
+                      , notify_uri
+                      , overwrite_existing
+                    )
+                  , validation_meta
+                )
+            else:
+                response = self._api_add_contact_ambiguous(
+                    list_name
+                  , chunk_data
+                  , notify_uri
+                  , validate
+                )
+            
+            if response['ok']:
+                chunk_meta  = response.get('meta') or {}
+                rejected    = chunk_meta.get('rejected', [])
+                meta['duplicates'] += chunk_meta.get('duplicates', 0)
+            elif (not creating) and (response['result'] is PureResponseClient.ERRORS.INVALID_CONTACTS):
+                rejected    = response['meta']
+            else:
+                return self._dict_err(
+                    response['result']
+                  , dict(meta, chunk = chunk, response = response)
+                )
+            meta['rejected'].extend(
+                dict(rejection, index = rejection['index'] + start)
+                for rejection in rejected
+            )
+            checkpoint.acknowledge(chunk)
+        checkpoint.discard()
+        return self._dict_ok(PureResponseClient.VALUES.SUCCESS, meta)
+    
+    @_profiled
+    def api_validate_contacts(self, contacts):
+        """
+        Validate and normalise contacts locally, without a round trip.
+        Checks email syntax, mobile format and utf-8 encoding, strips 
+        new lines and reports custom fields beyond the number allowed 
+        by the account level. On success the result holds 'contacts' 
+        (normalised, ready to upload), 'rejected' and 'dropped_fields', 
+        if no contacts are valid an ERROR_INVALID_CONTACTS error is 
+        returned with the rejected contacts as meta.
+        ----------------------------------------------
+        @param contacts         - list of dictionaries
+        """
+        if self.validator is None:
+            self.validator = ContactValidator()
+        with self._span('validate'):
+            validation = self.validator.validate(
+                contacts
+              , getattr(self, 'api_account_level', PureResponseClient.VALUES.ACCOUNT_LEVEL_LITE)
+            )
+        if not validation['contacts']:
+            return self._dict_err(
+                PureResponseClient.ERRORS.INVALID_CONTACTS
+              , validation['rejected']
+            )
+        return self._dict_ok(validation)
+    
+    def _with_meta(self, response, meta):
+        """
+        Internal use.
+        Attach information gathered before the upload, such as the 
+        outcome of validation, to a successful response.
+        """
+        if (meta is not None) and response.get('ok'):
+            response['meta'] = meta
+        return response
     
     def api_make_request(self, bean_type, bean_class, bean_process
       , entity_data = None, process_data = None, no_response = False):
+        self._check_fork()
+        if (self.api_context is None) and (self._credentials is not None) and (
+            bean_process is not PureResponseClient.BEAN_PROCESSES.AUTHENTICATE):
+            self._api_authenticate_lazily()
         if self.api_context or (bean_process is PureResponseClient.BEAN_PROCESSES.AUTHENTICATE):
-            api_context = self.api_context or suds.null()
+            if (self.coalescer is not None and not no_response
+                and bean_process in PureResponseClient.COALESCED_PROCESSES):
+                key = (
+                    self.api_context
+                  , bean_type
+                  , bean_class
+                  , bean_process
+                  , self._freeze(entity_data)
+                  , self._freeze(process_data)
+                )
+                return self.coalescer.do(
+                    key
+                  , self._api_handle_request
+                  , bean_type
+                  , bean_class
+                  , bean_process
+                  , entity_data
+                  , process_data
+                  , no_response
+                )
+            return self._api_handle_request(
+                bean_type
+              , bean_class
+              , bean_process
+              , entity_data
+              , process_data
+              , no_response
+            )
+        else:
+            return self._dict_err(
+                PureResponseClient.ERRORS.NOT_AUTHENTICATED
+              , None
+            )
+    
+    def _api_handle_request(self, bean_type, bean_class, bean_process
+      , entity_data, process_data, no_response):
+        """
+        Internal use.
+        Send the request through the circuit breaker and bulkhead of 
+        its bean class. Requests raising an exception count as failed 
+        for the breaker, see Isolation, the ones rejected are not sent 
+        at all.
+        """
+        isolation = self.isolation
+        if isolation is None:
+            return self._api_record_request(
+                bean_type
+              , bean_class
+              , bean_process
+              , entity_data
+              , process_data
+              , no_response
+            )
+        breaker = isolation.breaker(bean_class)
+        if not breaker.allow():
+            return self._dict_err(
+                PureResponseClient.ERRORS.CIRCUIT_OPEN
+              , bean_class
+            )
+        bulkhead = isolation.bulkhead(bean_class)
+        if (bulkhead is not None) and not bulkhead.acquire():
+            breaker.cancel()
+            return self._dict_err(
+                PureResponseClient.ERRORS.BULKHEAD_FULL
+              , bean_class
+            )
+        start   = time.time()
+        failed  = True
+        try:
+            response = self._api_record_request(
+                bean_type
+              , bean_class
+              , bean_process
+              , entity_data
+              , process_data
+              , no_response
+            )
+            failed = False
+            return response
+        finally:
+            if bulkhead is not None:
+                bulkhead.release()
+            breaker.record(failed, time.time() - start)
+    
+    def _api_record_request(self, bean_type, bean_class, bean_process
+      , entity_data, process_data, no_response):
+        """
+        Internal use.
+        Send the request, completing its exchange in self.wire_log.
+        """
+        wire_log = self.wire_log
+        if wire_log is None:
+            return self._api_send_request(
+                bean_type
+              , bean_class
+              , bean_process
+              , entity_data
+              , process_data
+              , no_response
+            )
+        try:
+            response = self._api_send_request(
+                bean_type
+              , bean_class
+              , bean_process
+              , entity_data
+              , process_data
+              , no_response
+            )
+        except Exception, e:
+            wire_log.finish(bean_type + '_' + bean_class, bean_process, error = e)
+            raise
+        wire_log.finish(bean_type + '_' + bean_class, bean_process, response)
+        return response
+    
+    def _api_send_request(self, bean_type, bean_class, bean_process
+      , entity_data, process_data, no_response):
+        """
+        Internal use.
+        Marshal the request, send it and unmarshal the response.
+        """
+        if self.profiler is not None:
+            return self._api_handle_request_profiled(
+                bean_type
+              , bean_class
+              , bean_process
+              , entity_data
+              , process_data
+              , no_response
+            )
+        api_context = self.api_context or _suds().null()
+        response    = self.api_client.service.handleRequest(
+                        api_context
+                      , bean_type + '_' + bean_class
+                      , bean_process
+                      , self._dict_to_ptarr(entity_data)
+                      , self._dict_to_ptarr(process_data)
+                    )
+        if no_response:
+            return True
+        else:
+            return self._ptarr_to_dict(response)
+    
+    def _api_handle_request_profiled(self, bean_type, bean_class, bean_process
+      , entity_data, process_data, no_response):
+        """
+        Internal use.
+        Same as self._api_send_request, recording a span for each 
+        stage of the request. The time spent inside suds is split 
+        into building the envelope, the network round trip and 
+        parsing the reply using marks set by _PaintPlugin.
+        """
+        profiler = self.profiler
+        with profiler.span('handleRequest', bean = bean_type + '_' + bean_class
+            , process = bean_process) as span:
+            api_context = self.api_context or _suds().null()
+            with profiler.span('_dict_to_ptarr'):
+                entity_arr  = self._dict_to_ptarr(entity_data)
+                process_arr = self._dict_to_ptarr(process_data)
+            suds_start  = time.time()
             response    = self.api_client.service.handleRequest(
                             api_context
                           , bean_type + '_' + bean_class
                           , bean_process
-                          , self._dict_to_ptarr(entity_data)
-                          , self._dict_to_ptarr(process_data)
+                          , entity_arr
+                          , process_arr
                         )
+            suds_end    = time.time()
+            sending     = span.marks.get('sending')
+            received    = span.marks.get('received')
+            profiler.add_span(span, 'suds.envelope', suds_start, sending)
+            profiler.add_span(span, 'network', sending, received)
+            profiler.add_span(span, 'suds.unmarshal', received, suds_end)
             if no_response:
                 return True
-            else:
+            with profiler.span('_ptarr_to_dict'):
                 return self._ptarr_to_dict(response)
-        else:
-            return self._dict_err(
-                PureResponseClient.ERRORS.NOT_AUTHENTICATED
-              , None
+    
+    def _freeze(self, data):
+        """
+        Internal use.
+        Build a hashable representation of (nested) request data 
+        for use as a coalescing key.
+        ----------------------------------------------
+        @param data         - dictionary (or value) to freeze.
+        """
+        if isinstance(data, dict):
+            return frozenset(
+                (key, self._freeze(value)) for key, value in data.iteritems()
             )
+        elif isinstance(data, list):
+            return tuple(self._freeze(value) for value in data)
+        return data
     
     def _response_data(self, response_dict, bean_type = None
         , bean_class = None, field = FIELDS.RESULT_DATA):
@@ -796,6 +4061,15 @@ class PureResponseClient(object):
     def _get_result(self, response):
         return self._response_data(response, field=PureResponseClient.FIELDS.RESULT)
     
+    def _rejected(self, response):
+        """
+        Internal use.
+        Whether a request was refused by the client itself rather 
+        than answered by the API (not authenticated, circuit open, 
+        bulkhead full), response then being the error to return.
+        """
+        return _response_failed(response)
+    
     def _result_success(self, response):
         return self._get_result(response) == PureResponseClient.VALUES.SUCCESS
     
@@ -816,7 +4090,9 @@ class PureResponseClient(object):
     def _result_exception(self, response, exception):
         return self._get_result(response) is exception
     
-    def _dict_ok(self, result = VALUES.SUCCESS):
+    def _dict_ok(self, result = VALUES.SUCCESS, meta = None):
+        if meta is not None:
+            return {'ok' : True, 'result': result, 'meta' : meta}
         return {'ok' : True, 'result': result}
     
     def _dict_err(self, error = ERRORS.GENERIC, meta = None):
@@ -836,6 +4112,26 @@ class PureResponseClient(object):
                     return True
             return False
     
+    def _key_plan(self, key):
+        """
+        Internal use.
+        Encoding plan for a key of a dictionary converted by 
+        self._dict_to_ptarr, a tuple of the encoded key, the key 
+        with the base64 suffix and whether unicode values are sent 
+        as plain strings. Memoized in PureResponseClient.KEY_PLANS.
+        ----------------------------------------------
+        @param key          - dictionary key.
+        """
+        plan = PureResponseClient.KEY_PLANS.get(key)
+        if plan is None:
+            encoded = key.encode('ascii', 'ignore')
+            plan = PureResponseClient.KEY_PLANS.put(key, (
+                encoded
+              , encoded + PureResponseClient.FIELDS.BASE64_PARTIAL
+              , self._unicode_exceptions(key)
+            ))
+        return plan
+    
     def _dict_to_ptarr(self, dict_):
         """
         Internal use.
@@ -848,30 +4144,29 @@ class PureResponseClient(object):
         @param dict_        - dictionary of data to convert.
         """
         if not dict_:
-            return suds.null()
-        arr_ = self.api_client.factory.create(PureResponseClient.TYPES.ARRAY)
-        for key_ in dict_:
-            kvp_ = self.api_client.factory.create(PureResponseClient.TYPES.KVP)
-            setattr(kvp_, PureResponseClient.TYPES.KEYS.KEY, key_.encode('ascii', 'ignore'))
+            return _suds().null()
+        factory = self.api_client.factory
+        arr_    = factory.create(PureResponseClient.TYPES.ARRAY)
+        pairs_  = getattr(arr_, PureResponseClient.TYPES.KEYS.PAIRS)
+        for key_, value in dict_.iteritems():
+            key_plain, key_base64, unicode_plain = self._key_plan(key_)
+            kvp_ = factory.create(PureResponseClient.TYPES.KVP)
             val_ = getattr(kvp_, PureResponseClient.TYPES.KEYS.VALUE)
-            if isinstance(dict_[key_], dict):
-                setattr(val_, PureResponseClient.TYPES.KEYS.ARRAY, self._dict_to_ptarr(dict_[key_]))
-            elif (isinstance(dict_[key_], str) or 
-                (isinstance(dict_[key_], unicode) and self._unicode_exceptions(key_))):
-                setattr(val_, PureResponseClient.TYPES.KEYS.STRING, dict_[key_].encode('utf-8'))
-            elif isinstance(dict_[key_], unicode):
-                setattr(val_, PureResponseClient.TYPES.KEYS.STRING, base64.b64encode(
-                    dict_[key_].encode('utf-8')
+            if isinstance(value, dict):
+                setattr(kvp_, PureResponseClient.TYPES.KEYS.KEY, key_plain)
+                setattr(val_, PureResponseClient.TYPES.KEYS.ARRAY, self._dict_to_ptarr(value))
+            elif isinstance(value, str) or (isinstance(value, unicode) and unicode_plain):
+                setattr(kvp_, PureResponseClient.TYPES.KEYS.KEY, key_plain)
+                setattr(val_, PureResponseClient.TYPES.KEYS.STRING, value.encode('utf-8'))
+            elif isinstance(value, unicode):
+                setattr(kvp_, PureResponseClient.TYPES.KEYS.KEY, key_base64)
+                setattr(val_, PureResponseClient.TYPES.KEYS.STRING, _base64().b64encode(
+                    value.encode('utf-8')
                 ))
-                setattr(
-                    kvp_
-                  , PureResponseClient.TYPES.KEYS.KEY
-                  , getattr(kvp_, PureResponseClient.TYPES.KEYS.KEY) 
-                    + PureResponseClient.FIELDS.BASE64_PARTIAL
-                )
             else:
-                setattr(val_, PureResponseClient.TYPES.KEYS.STRING, str(dict_[key_]))
-            getattr(arr_, PureResponseClient.TYPES.KEYS.PAIRS).append(kvp_)
+                setattr(kvp_, PureResponseClient.TYPES.KEYS.KEY, key_plain)
+                setattr(val_, PureResponseClient.TYPES.KEYS.STRING, str(value))
+            pairs_.append(kvp_)
         return arr_
     
     def _ptarr_to_dict(self, ptarr):
@@ -930,6 +4225,11 @@ class PureResponseClient(object):
             count += 1
         return entity_data
     
+    def _encode_utf8(self, value):
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        return str(value)
+    
     def _fixtype_value(self, key, value):
         if isinstance(value, str) or isinstance(value, unicode):
             return (value.encode('utf-8')).replace(
@@ -951,6 +4251,8 @@ class PureResponseClient(object):
         ----------------------------------------------
         @param list_        - list of dictionaries to convert.
         """
+        import csv
+        import StringIO
         master = set()
         for row in list_:
             master = master.union(row.keys())
@@ -0,0 +1,115 @@
+#
+#   Test helpers: a PureResponseClient built from a local copy of 
+#   the wsdl, whose requests are answered by a stub transport 
+#   instead of the network. Requires suds.
+#
+
+import os
+import re
+from xml.sax.saxutils import escape
+
+try:
+    import suds.client
+    import suds.transport
+except ImportError:
+    suds = None
+
+import pypurepaint
+from pypurepaint import PureResponseClient
+
+WSDL = 'file://' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'paint.wsdl')
+
+ENVELOPE = (
+    '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/" '
+    'xmlns:ns1="http://paint.test/"><SOAP-ENV:Body><ns1:handleRequestResponse>'
+    '<return>%s</return></ns1:handleRequestResponse></SOAP-ENV:Body></SOAP-ENV:Envelope>'
+)
+
+def paint_array(data):
+    """
+    Serialise a (nested) dictionary as the pairs of a paintArray.
+    """
+    pairs = []
+    for key, value in data.iteritems():
+        if isinstance(value, dict):
+            value = '<arr>%s</arr>' % paint_array(value)
+        else:
+            value = '<str>%s</str>' % escape(value)
+        pairs.append('<pairs><key>%s</key><value>%s</value></pairs>' % (key, value))
+    return ''.join(pairs)
+
+def success(bean_key = None, data = None):
+    result_data = {bean_key : data} if bean_key is not None else {}
+    return {'result' : 'success', 'resultData' : result_data}
+
+def default_handler(class_name, process_name, message):
+    if class_name == 'bus_facade_context':
+        return success('bus_entity_context', {'beanId' : 'SESSION-KEY'})
+    if process_name == 'search':
+        return success('bus_search_' + class_name[len('bus_facade_'):], {'idData' : {}})
+    if process_name == 'create':
+        return success('bus_entity_' + class_name[len('bus_facade_'):], {'beanId' : 'BEAN-1'})
+    return success()
+
+def lookup_handler(class_name, process_name, message):
+    """
+    As default_handler, except that searches find the list named 
+    'list' and the message named 'message'.
+    """
+    bean = class_name[len('bus_facade_'):]
+    if process_name == 'search':
+        return success('bus_search_' + bean, {'idData' : {'0' : {'beanId' : 'BEAN-2'}}})
+    if process_name == 'load':
+        return success('bus_entity_' + bean, {
+            'listName'      : 'list'
+          , 'listId'        : 'LIST-1'
+          , 'messageName'   : 'message'
+          , 'messageId'     : 'MESSAGE-1'
+        })
+    return default_handler(class_name, process_name, message)
+
+if suds is not None:
+    class StubTransport(suds.transport.Transport):
+        """
+        Transport answering each request with handler(class name, 
+        process name, envelope), a dictionary serialised as the 
+        returned paintArray, or raising what the handler raises.
+        """
+        def __init__(self, handler = default_handler):
+            suds.transport.Transport.__init__(self)
+            self.handler    = handler
+            self.sent       = []
+        
+        def __deepcopy__(self, memo = {}):
+            # suds clones the transport for each thread's client, 
+            # the clones share the handler and what was sent
+            clone = StubTransport(self.handler)
+            clone.sent = self.sent
+            return clone
+        
+        def send(self, request):
+            message = request.message
+            self.sent.append(message)
+            class_name      = re.search(r'<className>(.*?)</className>', message).group(1)
+            process_name    = re.search(r'<processName>(.*?)</processName>', message).group(1)
+            reply = self.handler(class_name, process_name, message)
+            return suds.transport.Reply(200, {}, ENVELOPE % paint_array(reply))
+
+def stub_client(handler = default_handler, **options):
+    """
+    Unauthenticated client whose requests go to a StubTransport.
+    """
+    return install_stub(PureResponseClient(WSDL, **options), handler)
+
+def install_stub(client, handler = default_handler):
+    """
+    Send the requests of client to a StubTransport, for instance 
+    again after a fork dropped the stub with the rest of the 
+    transport.
+    """
+    client.api_client = suds.client.Client(
+        WSDL
+      , plugins     = [pypurepaint._paint_plugin(client)]
+      , transport   = StubTransport(handler)
+    )
+    return client
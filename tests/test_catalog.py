@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from tests.support import suds, stub_client, default_handler
+from pypurepaint import Catalog, PureResponseClient
+
+class CatalogFileTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'catalog.json')
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_interrupted_save_keeps_the_previous_index(self):
+        catalog = Catalog(path = self.path)
+        catalog.replace({u'list' : {'listId' : '1'}}, {}, u'user')
+        dump = json.dump
+        def interrupted(data, output):
+            output.write('{"refreshed": ')
+            raise KeyboardInterrupt()
+        json.dump = interrupted
+        try:
+            self.assertRaises(
+                KeyboardInterrupt
+              , catalog.replace, {u'other' : {'listId' : '2'}}, {}, u'user'
+            )
+        finally:
+            json.dump = dump
+        loaded = Catalog(path = self.path)
+        self.assertEqual(loaded.get(Catalog.LISTS, u'list'), {'listId' : '1'})
+        self.assertEqual(loaded.account, u'user')
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class CatalogRefreshTest(unittest.TestCase):
+    
+    def test_failed_refresh_is_not_retried_at_once(self):
+        refreshes = []
+        def handler(class_name, process_name, message):
+            if (process_name == 'search') and ('<str></str>' in message or '<str/>' in message):
+                refreshes.append(class_name)
+                return {'result' : PureResponseClient.EXCEPTIONS.VALIDATION, 'resultData' : {}}
+            return default_handler(class_name, process_name, message)
+        catalog = Catalog()
+        client = stub_client(handler, catalog = catalog)
+        client.api_authenticate(u'user', u'password')
+        for _ in range(5):
+            client._catalog_lookup(PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST, u'list')
+            deadline = time.time() + 5
+            while catalog.refreshing and (time.time() < deadline):
+                time.sleep(0.01)
+        # one refresh searches lists and messages once each
+        self.assertEqual(len(refreshes), 2)
+        self.assertIsNotNone(catalog.failed)
+        self.assertFalse(catalog.needs_refresh(u'user'))
+        catalog.failed -= catalog.retry_interval
+        self.assertTrue(catalog.needs_refresh(u'user'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import re
+import threading
+import unittest
+
+from tests.support import suds, stub_client, default_handler, success
+from pypurepaint import PureResponseClient
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class ClientThreadsTest(unittest.TestCase):
+    
+    def test_replies_are_not_shared_between_threads(self):
+        def handler(class_name, process_name, message):
+            if process_name == 'load':
+                bean_id = re.search(r'<str>(BEAN-[0-9-]+)</str>', message).group(1)
+                return success('bus_entity_campaign_list', {'beanId' : bean_id})
+            return default_handler(class_name, process_name, message)
+        client = stub_client(handler, coalesce_requests = False)
+        client.api_authenticate(u'user', u'password')
+        mismatches = []
+        def load(thread):
+            for number in range(50):
+                bean_id = 'BEAN-%d-%d' % (thread, number)
+                response = client.api_make_request(
+                    PureResponseClient.BEAN_TYPES.FACADE
+                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+                  , PureResponseClient.BEAN_PROCESSES.LOAD
+                  , {'beanId' : bean_id}
+                )
+                loaded = client._get_bean_id(
+                    response
+                  , PureResponseClient.BEAN_TYPES.ENTITY
+                  , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+                )
+                if loaded != bean_id:
+                    mismatches.append((bean_id, loaded))
+        threads = [threading.Thread(target = load, args = (thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mismatches, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from tests.support import suds, stub_client, default_handler
+from pypurepaint import BloomContactIndex, DbmContactIndex
+
+CONTACT = {'email' : 'someone@example.none', 'name' : 'someone'}
+
+class ContactIndexTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def indexes(self):
+        return [
+            BloomContactIndex(capacity = 100)
+          , DbmContactIndex(os.path.join(self.directory, 'index'))
+        ]
+    
+    def test_reserve_add_release(self):
+        for index in self.indexes():
+            self.assertTrue(index.reserve('list', CONTACT))
+            # claimed by an upload under way
+            self.assertFalse(index.reserve('list', CONTACT))
+            index.release('list', CONTACT)
+            self.assertTrue(index.reserve('list', CONTACT))
+            index.add('list', CONTACT)
+            self.assertTrue(index.contains('list', CONTACT))
+            self.assertFalse(index.reserve('list', CONTACT))
+            # changed data and other lists are uploaded
+            self.assertTrue(index.reserve('list', dict(CONTACT, name = 'renamed')))
+            self.assertTrue(index.reserve('other', CONTACT))
+            # contacts without an email are never held back
+            self.assertTrue(index.reserve('list', {'mobile' : '+447700900123'}))
+            self.assertTrue(index.reserve('list', {'mobile' : '+447700900123'}))
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class ContactIndexClientTest(unittest.TestCase):
+    
+    def test_concurrent_duplicates_are_uploaded_once(self):
+        appends = []
+        entered = threading.Event()
+        release = threading.Event()
+        def handler(class_name, process_name, message):
+            if (class_name == 'bus_facade_campaign_list') and (process_name == 'store'):
+                appends.append(message)
+                entered.set()
+                release.wait(5)
+            return default_handler(class_name, process_name, message)
+        client = stub_client(handler, contact_index = BloomContactIndex(capacity = 100))
+        client.api_authenticate(u'user', u'password')
+        responses = []
+        thread = threading.Thread(
+            target = lambda: responses.append(client.api_add_contact('list', dict(CONTACT)))
+        )
+        thread.start()
+        entered.wait(5)
+        try:
+            response = client.api_add_contact('list', dict(CONTACT))
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(response['meta']['duplicates'], 1)
+        self.assertTrue(responses[0]['ok'])
+        self.assertEqual(len(appends), 1)
+    
+    def test_failed_upload_releases_its_contacts(self):
+        failures = [IOError('connection reset')]
+        def handler(class_name, process_name, message):
+            if (class_name == 'bus_facade_campaign_list') and (process_name == 'store') and failures:
+                raise failures.pop()
+            return default_handler(class_name, process_name, message)
+        client = stub_client(handler, contact_index = BloomContactIndex(capacity = 100))
+        client.api_authenticate(u'user', u'password')
+        self.assertRaises(IOError, client.api_add_contact, 'list', dict(CONTACT))
+        response = client.api_add_contact('list', dict(CONTACT))
+        self.assertTrue(response['ok'])
+        self.assertEqual(response['meta']['duplicates'], 0)
+        self.assertEqual(client.api_add_contact('list', dict(CONTACT))['meta']['duplicates'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from pypurepaint import ContactValidator, _numpy
+
+class ContactValidatorTest(unittest.TestCase):
+    
+    use_numpy = False
+    
+    def setUp(self):
+        self.validator = ContactValidator(use_numpy = self.use_numpy)
+    
+    def validate(self, contacts):
+        return self.validator.validate(contacts)
+    
+    def test_lists_are_the_default(self):
+        self.assertIsNone(ContactValidator().numpy)
+    
+    def test_mobile_trunk_prefix(self):
+        mobiles = [
+            (u'+44 (0)7700-900123', u'+447700900123')
+          , (u'(0)7700 900123', u'07700900123')
+          , (u'+1 (415) 555-0100', u'+14155550100')
+          , (u'07700.900.123', u'07700900123')
+        ]
+        result = self.validate([{'mobile' : mobile} for mobile, _ in mobiles])
+        self.assertEqual(result['rejected'], [])
+        self.assertEqual(
+            [contact['mobile'] for contact in result['contacts']]
+          , [normalised for _, normalised in mobiles]
+        )
+    
+    def test_invalid_rows_are_rejected(self):
+        result = self.validate([
+            {'email' : u' Someone@Example.com '}
+          , {'email' : u'someone'}
+          , {'mobile' : u'12'}
+          , {'name' : u'nobody'}
+          , {'email' : 'caf\xe9@example.com'}
+        ])
+        self.assertEqual([contact['email'] for contact in result['contacts']], [u'someone@example.com'])
+        self.assertEqual(
+            [(rejection['index'], rejection['reasons']) for rejection in result['rejected']]
+          , [
+                (1, [ContactValidator.REASONS.INVALID_EMAIL])
+              , (2, [ContactValidator.REASONS.INVALID_MOBILE])
+              , (3, [ContactValidator.REASONS.NO_ADDRESS])
+              , (4, [ContactValidator.REASONS.INVALID_ENCODING, ContactValidator.REASONS.NO_ADDRESS])
+            ]
+        )
+
+@unittest.skipIf(_numpy() is None, 'numpy is not installed')
+class NumpyContactValidatorTest(ContactValidatorTest):
+    
+    use_numpy = True
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import select
+import signal
+import threading
+import unittest
+
+from tests.support import suds, stub_client, install_stub, default_handler, success
+from pypurepaint import DeliveryTracker
+
+def handler(class_name, process_name, message):
+    if (class_name == 'bus_facade_campaign_delivery') and (process_name == 'load'):
+        return success('bus_entity_campaign_delivery', {'status' : 'sent'})
+    return default_handler(class_name, process_name, message)
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class DeliveryTrackerTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.client = stub_client(handler)
+        self.client.api_authenticate(u'user', u'password')
+        self.tracker = DeliveryTracker(self.client, min_interval = 0.01)
+    
+    def tearDown(self):
+        self.tracker.close()
+    
+    def test_completions_are_not_kept_without_as_completed(self):
+        futures = [self.tracker.track('DELIVERY-%d' % number) for number in range(5)]
+        for future in futures:
+            self.assertTrue(future.result(5)['ok'])
+        self.assertEqual(self.tracker.pending(), 0)
+        self.assertEqual(self.tracker._completed.qsize(), 0)
+    
+    def test_as_completed_yields_completions(self):
+        self.tracker.min_interval = 0.2
+        futures = set(self.tracker.track('DELIVERY-%d' % number) for number in range(3))
+        completed = set(self.tracker.as_completed())
+        self.assertEqual(completed, futures)
+        self.assertEqual(self.tracker._completed.qsize(), 0)
+    
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_tracking_in_a_forked_child(self):
+        self.client.delivery_tracker = self.tracker
+        # fork while another thread holds the tracker's lock
+        held = threading.Event()
+        release = threading.Event()
+        def hold():
+            with self.tracker._condition:
+                held.set()
+                release.wait(5)
+        holder = threading.Thread(target = hold)
+        holder.start()
+        held.wait(5)
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(read_end)
+                self.client._check_fork()
+                install_stub(self.client, handler)
+                future = self.tracker.track('DELIVERY-CHILD')
+                response = future.result(5)
+                if response is not None and response['ok']:
+                    os.write(write_end, 'ok')
+                status = 0
+            finally:
+                os._exit(status)
+        release.set()
+        holder.join()
+        os.close(write_end)
+        # a child stuck on an inherited lock never answers
+        if select.select([read_end], [], [], 10)[0]:
+            outcome = os.read(read_end, 2)
+        else:
+            outcome = None
+            os.kill(pid, signal.SIGKILL)
+        os.close(read_end)
+        os.waitpid(pid, 0)
+        self.assertEqual(outcome, 'ok')
+
+if __name__ == '__main__':
+    unittest.main()
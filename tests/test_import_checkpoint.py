@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tests.support import suds, stub_client, default_handler
+from pypurepaint import ImportCheckpoint
+
+CONTACTS = [{'email' : 'contact%d@example.none' % number} for number in range(5)]
+
+class ImportCheckpointTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_missing_directory_is_created(self):
+        directory = os.path.join(self.directory, 'imports', 'lists')
+        checkpoint = ImportCheckpoint(directory, u'list', CONTACTS, 2)
+        checkpoint.acknowledge(0)
+        self.assertEqual(ImportCheckpoint(directory, u'list', CONTACTS, 2).acknowledged, 1)
+    
+    def test_other_input_starts_from_the_first_chunk(self):
+        ImportCheckpoint(self.directory, u'list', CONTACTS, 2).acknowledge(1)
+        self.assertEqual(ImportCheckpoint(self.directory, u'list', CONTACTS, 2).acknowledged, 2)
+        self.assertEqual(ImportCheckpoint(self.directory, u'list', CONTACTS[1:], 2).acknowledged, 0)
+        self.assertEqual(ImportCheckpoint(self.directory, u'list', CONTACTS, 3).acknowledged, 0)
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class ResumableImportTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'imports')
+        self.stores = []
+        self.fail_store = None
+    
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+    
+    def handler(self, class_name, process_name, message):
+        if process_name == 'store':
+            self.stores.append(message)
+            if len(self.stores) == self.fail_store:
+                raise IOError('connection reset')
+        return default_handler(class_name, process_name, message)
+    
+    def test_resume_after_failure(self):
+        client = stub_client(self.handler)
+        client.api_authenticate(u'user', u'password')
+        self.fail_store = 2
+        self.assertRaises(
+            IOError
+          , client.api_add_contacts, 'list', CONTACTS
+          , checkpoint_dir = self.directory, chunk_size = 2
+        )
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        self.fail_store = None
+        del self.stores[:]
+        response = client.api_add_contacts(
+            'list', CONTACTS, checkpoint_dir = self.directory, chunk_size = 2
+        )
+        self.assertTrue(response['ok'])
+        self.assertEqual(response['meta']['chunks'], 3)
+        self.assertEqual(response['meta']['resumed_at'], 1)
+        # the acknowledged chunk is not sent again
+        self.assertEqual(len(self.stores), 2)
+        self.assertEqual(os.listdir(self.directory), [])
+
+if __name__ == '__main__':
+    unittest.main()
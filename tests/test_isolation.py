@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from tests.support import suds, stub_client, default_handler, lookup_handler
+from pypurepaint import PureResponseClient, Isolation
+
+CONTACT = {'email' : 'blackhole@example.none'}
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class IsolationTest(unittest.TestCase):
+    
+    def client(self, handler, **options):
+        options.setdefault('min_calls', 3)
+        options.setdefault('window', 3)
+        self.isolation = Isolation(**options)
+        client = stub_client(handler, isolation = self.isolation)
+        client.api_authenticate(u'user', u'password')
+        return client
+    
+    def test_breaker_opens_through_public_method(self):
+        def handler(class_name, process_name, message):
+            if class_name == 'bus_facade_campaign_list':
+                raise IOError('connection reset')
+            return lookup_handler(class_name, process_name, message)
+        client = self.client(handler)
+        for _ in range(3):
+            self.assertRaises(IOError, client.api_add_contact, 'list', dict(CONTACT))
+        for method, args in [
+            (client.api_add_contact, ('list', dict(CONTACT)))
+          , (client.api_create_contact_list, ('list', [dict(CONTACT)]))
+          , (client.api_send_to_list, ('list', 'message'))
+        ]:
+            response = method(*args)
+            self.assertFalse(response['ok'])
+            self.assertEqual(response['result'], PureResponseClient.ERRORS.CIRCUIT_OPEN)
+        # other bean classes are unaffected
+        self.assertTrue(client.api_send_to_contact('blackhole@example.none', 'message')['ok'])
+    
+    def test_paint_errors_do_not_open_breaker(self):
+        def handler(class_name, process_name, message):
+            if class_name == 'bus_facade_campaign_list':
+                return {'result' : PureResponseClient.EXCEPTIONS.VALIDATION, 'resultData' : {}}
+            return default_handler(class_name, process_name, message)
+        client = self.client(handler)
+        for _ in range(5):
+            response = client.api_add_contact('list', dict(CONTACT))
+            self.assertEqual(response['result'], PureResponseClient.ERRORS.GENERIC)
+        self.assertEqual(
+            self.isolation.breaker(PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST).state
+          , 'closed'
+        )
+    
+    def test_bulkhead_full_through_public_method(self):
+        entered = threading.Event()
+        release = threading.Event()
+        def handler(class_name, process_name, message):
+            if class_name == 'bus_facade_campaign_list':
+                entered.set()
+                release.wait(5)
+            return default_handler(class_name, process_name, message)
+        client = self.client(handler, limits = {
+            PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST : 1
+        })
+        responses = []
+        thread = threading.Thread(
+            target = lambda: responses.append(client.api_add_contact('list', dict(CONTACT)))
+        )
+        thread.start()
+        entered.wait(5)
+        try:
+            response = client.api_add_contact('list', dict(CONTACT))
+            self.assertEqual(response['result'], PureResponseClient.ERRORS.BULKHEAD_FULL)
+        finally:
+            release.set()
+            thread.join()
+        self.assertTrue(responses[0]['ok'])
+
+if __name__ == '__main__':
+    unittest.main()
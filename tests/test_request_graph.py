@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from tests.support import suds, stub_client, lookup_handler
+from pypurepaint import Profiler, RequestGraph
+
+def run_within(test, func, timeout = 10.0):
+    """
+    Run func on a thread, failing the test if it has not returned
+    within timeout rather than hanging the run.
+    """
+    outcome = {}
+    def target():
+        outcome['result'] = func()
+    thread = threading.Thread(target = target)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    test.assertFalse(thread.is_alive(), 'did not finish within %ss' % timeout)
+    return outcome['result']
+
+class RequestGraphTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.pool = ThreadPool(2)
+    
+    def tearDown(self):
+        self.pool.terminate()
+    
+    def test_steps_run_after_their_dependencies(self):
+        order = []
+        lock = threading.Lock()
+        def step(name):
+            def func(results):
+                with lock:
+                    order.append(name)
+                return name
+            return func
+        graph = RequestGraph()
+        graph.add('a', step('a'))
+        graph.add('b', step('b'))
+        graph.add('c', step('c'), depends = ('a', 'b'))
+        graph.add('d', step('d'), depends = ('c',))
+        results = graph.run(self.pool)
+        self.assertEqual(results, {'a' : 'a', 'b' : 'b', 'c' : 'c', 'd' : 'd'})
+        self.assertEqual(order[2:], ['c', 'd'])
+        self.assertIsNone(graph.failed())
+    
+    def test_failed_step_stops_the_graph(self):
+        ran = []
+        graph = RequestGraph()
+        graph.add('a', lambda results: {'ok' : False})
+        graph.add('b', lambda results: ran.append('b'), depends = ('a',))
+        results = graph.run(self.pool)
+        self.assertEqual(graph.failed(), 'a')
+        self.assertNotIn('b', results)
+        self.assertEqual(ran, [])
+    
+    def test_step_exception_is_reraised(self):
+        def fail(results):
+            raise IOError('connection reset')
+        graph = RequestGraph()
+        graph.add('a', fail)
+        graph.add('b', lambda results: 'b', depends = ('a',))
+        self.assertRaises(IOError, graph.run, self.pool)
+        self.assertNotIn('b', graph.results)
+    
+    def test_steps_are_traced_on_their_threads(self):
+        profiler = Profiler()
+        threads = {}
+        def step(name):
+            def func(results):
+                threads[name] = threading.current_thread().ident
+                time.sleep(0.01)
+            return func
+        graph = RequestGraph(profiler)
+        for name in ('a', 'b', 'c'):
+            graph.add(name, step(name))
+        with profiler.span('flow'):
+            graph.run(self.pool)
+        events = profiler.to_chrome_trace()['traceEvents']
+        for event in events:
+            if event['name'] in threads:
+                self.assertEqual(event['tid'], threads[event['name']])
+    
+    def test_nested_graphs_on_a_full_pool(self):
+        def inner(results):
+            graph = RequestGraph()
+            for name in ('x', 'y', 'z'):
+                graph.add(name, lambda results: time.sleep(0.01) or 'done')
+            return graph.run(self.pool)
+        graph = RequestGraph()
+        for name in ('a', 'b', 'c', 'd'):
+            graph.add(name, inner)
+        results = run_within(self, lambda: graph.run(self.pool))
+        self.assertEqual(sorted(results), ['a', 'b', 'c', 'd'])
+        for result in results.values():
+            self.assertEqual(result, {'x' : 'done', 'y' : 'done', 'z' : 'done'})
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class ClientFlowTest(unittest.TestCase):
+    
+    def test_send_to_list_within_a_flow(self):
+        client = stub_client(lookup_handler)
+        client.flow_concurrency = 2
+        client.api_authenticate(u'user', u'password')
+        graph = client.api_flow()
+        for name in ('a', 'b', 'c', 'd'):
+            graph.add(name, lambda results: client.api_send_to_list('list', 'message'))
+        results = run_within(self, lambda: graph.run(client.api_flow_pool()))
+        self.assertEqual(len(results), 4)
+        self.assertIsNone(graph.failed())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import StringIO
+import unittest
+
+from tests.support import suds, stub_client
+from pypurepaint import PureResponseClient, WireLog
+
+@unittest.skipIf(suds is None, 'suds is not installed')
+class WireLogTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.wire_log   = WireLog(sample_rate = 1.0)
+        self.client     = stub_client(wire_log = self.wire_log)
+        self.client.api_authenticate(u'user', u'secret-password')
+    
+    def dumped(self):
+        output = StringIO.StringIO()
+        self.wire_log.dump(output)
+        return output.getvalue()
+    
+    def test_authentication_is_redacted(self):
+        record = self.wire_log.records()[0]
+        self.assertEqual(record['bean'], 'bus_facade_context')
+        self.assertEqual(record['request'], WireLog.REDACTED)
+        self.assertEqual(record['response'], WireLog.REDACTED)
+    
+    def test_context_and_password_never_logged(self):
+        self.client.api_add_contact('list', {'email' : 'blackhole@example.none'})
+        dumped = self.dumped()
+        self.assertNotIn('SESSION-KEY', dumped)
+        self.assertNotIn('secret-password', dumped)
+        request = self.wire_log.records()[-1]['request']
+        self.assertIn('<className>bus_facade_campaign_list</className>', request)
+        self.assertIn('<context>%s</context>' % WireLog.REDACTED, request)
+    
+    def test_short_secret_leaves_envelope_intact(self):
+        client = stub_client(wire_log = self.wire_log)
+        client.api_authenticate(u'user', u'p')
+        client.api_add_contact('list', {'email' : 'blackhole@example.none'})
+        request = self.wire_log.records()[-1]['request']
+        self.assertIn('<processName>store</processName>', request)
+        self.assertIn('<context>%s</context>' % WireLog.REDACTED, request)
+    
+    def test_password_values_redacted_in_envelope(self):
+        self.client.api_make_request(
+            PureResponseClient.BEAN_TYPES.FACADE
+          , PureResponseClient.BEAN_CLASSES.CAMPAIGN_LIST
+          , PureResponseClient.BEAN_PROCESSES.STORE
+          , {PureResponseClient.FIELDS.PASSWORD : 'other-password'}
+        )
+        request = self.wire_log.records()[-1]['request']
+        self.assertNotIn('other-password', request)
+        self.assertIn('<str>%s</str>' % WireLog.REDACTED, request)
+    
+    def test_paste_file_truncated_and_hashed(self):
+        contacts = [{'email' : 'blackhole%d@example.none' % i} for i in range(200)]
+        self.client.api_add_contacts('list', contacts)
+        request = self.wire_log.records()[-1]['request']
+        self.assertIn('<key>pasteFile_base64</key>', request)
+        self.assertIn('sha1', request)
+        self.assertLess(len(request), 4096)
+        for line in self.dumped().splitlines():
+            json.loads(line)
+
+if __name__ == '__main__':
+    unittest.main()